@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Answer Cache
+Stores final answers of completed queries in SQLite so a repeated question about
+unchanged files is answered without calling Claude again
+"""
+
+import json
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+
+def normalize_query(query):
+    """Collapse whitespace only - case and punctuation can change what a query asks"""
+    return " ".join(query.split())
+
+def files_fingerprint(file_paths, system_prompt):
+    """
+    Hash of everything a cached answer depends on besides the query
+    Any file being added, removed, rewritten or touched - or a new system prompt - changes it
+    """
+    digest = hashlib.blake2b(system_prompt.encode('utf-8', 'ignore'), digest_size=16)
+    for path in sorted(file_paths):
+        try:
+            stat = os.stat(path)
+            digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8', 'ignore'))
+        except OSError:
+            digest.update(f"{path}\0missing\n".encode('utf-8', 'ignore'))
+    return digest.hexdigest()
+
+class AnswerCache:
+    """Final answers keyed by (namespace, whitespace-collapsed query), valid while the files fingerprint matches"""
+    
+    def __init__(self, db_path, ttl=86400):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                namespace TEXT NOT NULL,
+                query_key TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                final_answer TEXT NOT NULL,
+                files_accessed TEXT NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (namespace, query_key)
+            )
+        """)
+        self._conn.commit()
+    
+    def get(self, namespace, query, fingerprint):
+        """Return (final_answer, files_accessed) for a fresh matching entry, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT final_answer, files_accessed FROM answers "
+                "WHERE namespace = ? AND query_key = ? AND fingerprint = ? AND created > ?",
+                (namespace, normalize_query(query), fingerprint, time.time() - self.ttl)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+    
+    def put(self, namespace, query, fingerprint, final_answer, files_accessed):
+        """Store the answer for a query, replacing any older entry"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, normalize_query(query), fingerprint, final_answer,
+                 json.dumps(files_accessed, ensure_ascii=False), time.time())
+            )
+            self._conn.commit()
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
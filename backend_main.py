@@ -6,21 +6,25 @@ FastAPI backend that integrates all modules and serves the Next.js frontend
 
 import os
 import sys
-import json
 import asyncio
-import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set, Deque
 from contextlib import asynccontextmanager
 
 # FastAPI and related imports
-from fastapi import FastAPI, HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect, BackgroundTasks
+from fastapi import FastAPI, HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
+import orjson
+import aiofiles
+import aiofiles.os
 import uvicorn
+from server_config import server_options
 
 # Our existing modules
 from interactive import InteractiveAIFileQuerySystem
@@ -28,11 +32,6 @@ from pdf_converter import convert_pdf_to_txt, convert_pdf_to_xml
 from migrate_sessions import migrate_sessions_to_excel
 
 # Optional dependencies
-try:
-    import pandas as pd
-except ImportError:
-    pd = None
-    
 try:
     import openpyxl
 except ImportError:
@@ -40,15 +39,27 @@ except ImportError:
 
 # Optional excel integration (restored)
 try:
-    from excel_integration import append_session_from_json
+    from excel_integration import append_session_from_json, rebuild_xlsx_from_jsonl, resolve_system_prompt
 except ImportError:
     append_session_from_json = None
+    rebuild_xlsx_from_jsonl = None
+    resolve_system_prompt = None
     print("Warning: Excel integration not available")
 
 # Environment setup
 from dotenv import load_dotenv
 load_dotenv()
 
+# Data files (relative to the working directory)
+EXCEL_PATH = Path("query_tracking.xlsx")
+SYSTEM_PROMPT_PATH = Path("system_prompt.txt")
+
+# (mtime_ns, text) of the last system prompt read from disk
+_system_prompt_cache: Optional[tuple] = None
+
+# Most recent migration log entries kept for the status endpoint
+MIGRATION_LOG_LIMIT = 500
+
 # ============================================================================
 # Data Models
 # ============================================================================
@@ -94,7 +105,7 @@ class ConversionRequest(BaseModel):
 class MigrationStatus(BaseModel):
     isRunning: bool
     progress: int
-    logs: List[Dict[str, Any]]
+    logs: Deque[Dict[str, Any]]
     completed: bool
 
 # ============================================================================
@@ -105,8 +116,9 @@ class BackendState:
     def __init__(self):
         self.ai_system = None
         self.active_queries: Dict[str, Any] = {}
-        self.migration_status = MigrationStatus(isRunning=False, progress=0, logs=[], completed=False)
-        self.websocket_connections: List[WebSocket] = []
+        self.migration_status = MigrationStatus(isRunning=False, progress=0, logs=deque(maxlen=MIGRATION_LOG_LIMIT), completed=False)
+        self.websocket_connections: Set[WebSocket] = set()
+        self.save_queue: Optional[asyncio.Queue] = None
     
     async def initialize(self):
         """Initialize AI system and other components"""
@@ -120,46 +132,133 @@ class BackendState:
 # Global state instance
 state = BackendState()
 
+def dump_json(obj) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes with orjson"""
+    return orjson.dumps(obj)
+
+# Uploads are copied to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Files larger than this are parsed in a worker thread instead of on the event loop
+LARGE_JSON_BYTES = 1 << 20
+
+async def read_json(path: Path):
+    """Read and parse a JSON file without blocking the event loop"""
+    async with aiofiles.open(path, 'rb') as f:
+        raw = await f.read()
+    if len(raw) > LARGE_JSON_BYTES:
+        return await asyncio.to_thread(orjson.loads, raw)
+    return orjson.loads(raw)
+
+# Parsed session files keyed by path, reused while the file's mtime is unchanged
+_SESSION_CACHE: Dict[Path, tuple] = {}
+
+# Thread pool for reading and parsing many session files at once
+_IO_POOL = ThreadPoolExecutor(max_workers=min(16, (os.cpu_count() or 1) * 4), thread_name_prefix="session-io")
+
+def parse_json_file(path: Path):
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
+async def load_session_files(entries):
+    """
+    Parse the (path, stat) entries from scan_session_files, in the same order
+    Unchanged files come from the cache, the rest are read in parallel on the I/O pool
+    Each result is the parsed data, or the exception raised while reading that file
+    """
+    loop = asyncio.get_running_loop()
+    
+    async def load(path: Path, mtime_ns: int):
+        cached = _SESSION_CACHE.get(path)
+        if cached and cached[0] == mtime_ns:
+            return cached[1]
+        data = await loop.run_in_executor(_IO_POOL, parse_json_file, path)
+        _SESSION_CACHE[path] = (mtime_ns, data)
+        return data
+    
+    return await asyncio.gather(
+        *(load(path, stat.st_mtime_ns) for path, stat in entries),
+        return_exceptions=True
+    )
+
+def scan_session_files(directory: Path, prefix: str):
+    """List (path, stat) for the <prefix>*.json files in a directory, forgetting cached files that are gone"""
+    entries = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.name.startswith(prefix) and entry.name.endswith('.json') and entry.is_file():
+                entries.append((Path(entry.path), entry.stat()))
+    
+    present = {path for path, _ in entries}
+    for path in [p for p in _SESSION_CACHE if p.parent == directory and p.name.startswith(prefix) and p not in present]:
+        del _SESSION_CACHE[path]
+    
+    return entries
+
+def invalidate_session_cache(path: Path):
+    """Drop a session file from the parse cache after it is rewritten or deleted"""
+    _SESSION_CACHE.pop(path, None)
+
 # Chat persistence utilities
-def save_chat_session(session_id: str, messages: List[Dict], user_query: str = None):
-    """Save a chat session in frontend-friendly format"""
+async def write_chat_file(chat_file: Path, chat_data: Dict):
+    async with aiofiles.open(chat_file, 'wb') as f:
+        await f.write(dump_json(chat_data))
+    invalidate_session_cache(chat_file)
+
+async def chat_save_worker():
+    """Write queued chat sessions to disk in the background, off the request path"""
+    while True:
+        chat_file, chat_data = await state.save_queue.get()
+        try:
+            await write_chat_file(chat_file, chat_data)
+        except Exception as e:
+            print(f"Error saving chat session: {e}")
+        finally:
+            state.save_queue.task_done()
+
+async def save_chat_session(session_id: str, messages: List[Dict], user_query: str = None, timestamp: str = None):
+    """
+    Save a chat session in frontend-friendly format (timestamp defaults to now)
+    The write is queued for the background worker when the app is running
+    """
     try:
         chat_file = Path(f"frontend_chats/chat_{session_id}.json")
         chat_file.parent.mkdir(exist_ok=True)
         
+        timestamp = timestamp or datetime.now().isoformat()
         chat_data = {
             "id": session_id,
             "name": f"Chat {session_id.split('_')[-1]}",
             "messages": messages,
-            "created": datetime.now().isoformat(),
-            "lastUpdated": datetime.now().isoformat(),
+            "created": timestamp,
+            "lastUpdated": timestamp,
             "user_query": user_query
         }
         
-        with open(chat_file, 'w', encoding='utf-8') as f:
-            json.dump(chat_data, f, indent=2, ensure_ascii=False)
+        if state.save_queue is not None:
+            state.save_queue.put_nowait((chat_file, chat_data))
+        else:
+            await write_chat_file(chat_file, chat_data)
         
         return chat_file
     except Exception as e:
         print(f"Error saving chat session: {e}")
         return None
 
-def load_chat_sessions():
+async def load_chat_sessions():
     """Load all chat sessions from frontend_chats directory"""
     try:
         chats_dir = Path("frontend_chats")
         if not chats_dir.exists():
             return []
         
+        entries = scan_session_files(chats_dir, "chat_")
         sessions = []
-        for chat_file in chats_dir.glob("chat_*.json"):
-            try:
-                with open(chat_file, 'r', encoding='utf-8') as f:
-                    chat_data = json.load(f)
-                sessions.append(chat_data)
-            except Exception as e:
-                print(f"Error loading chat {chat_file}: {e}")
+        for (chat_file, _), chat_data in zip(entries, await load_session_files(entries)):
+            if isinstance(chat_data, Exception):
+                print(f"Error loading chat {chat_file}: {chat_data}")
                 continue
+            sessions.append(chat_data)
         
         # Sort by creation date (newest first)
         sessions.sort(key=lambda x: x.get('created', ''), reverse=True)
@@ -176,15 +275,24 @@ def load_chat_sessions():
 async def lifespan(app: FastAPI):
     # Startup
     await state.initialize()
+    state.save_queue = asyncio.Queue()
+    save_worker = asyncio.create_task(chat_save_worker())
     yield
     # Shutdown
     print("Shutting down backend...")
+    # Flush chat sessions still waiting to be written
+    await state.save_queue.join()
+    save_worker.cancel()
+    if state.ai_system:
+        await state.ai_system.close()
+    _IO_POOL.shutdown(wait=False)
 
 app = FastAPI(
     title="AI File Query Backend",
     description="Backend API for AI File Query System",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware for Next.js frontend
@@ -203,37 +311,38 @@ app.add_middleware(
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    state.websocket_connections.append(websocket)
+    state.websocket_connections.add(websocket)
     
     try:
         while True:
             # Keep connection alive and handle messages
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = orjson.loads(data)
             
             if message.get("type") == "ping":
-                await websocket.send_text(json.dumps({"type": "pong"}))
+                await websocket.send_text(dump_json({"type": "pong"}).decode())
     
     except WebSocketDisconnect:
-        state.websocket_connections.remove(websocket)
+        state.websocket_connections.discard(websocket)
     except Exception as e:
         print(f"WebSocket error: {e}")
-        if websocket in state.websocket_connections:
-            state.websocket_connections.remove(websocket)
+        state.websocket_connections.discard(websocket)
 
 async def broadcast_message(message: Dict[str, Any]):
     """Broadcast message to all connected clients"""
     if state.websocket_connections:
-        dead_connections = []
-        for connection in state.websocket_connections:
-            try:
-                await connection.send_text(json.dumps(message))
-            except:
-                dead_connections.append(connection)
+        # Serialize once and send to every client concurrently, so one slow client doesn't hold up the rest
+        payload = dump_json(message).decode()
+        connections = list(state.websocket_connections)
+        results = await asyncio.gather(
+            *(connection.send_text(payload) for connection in connections),
+            return_exceptions=True
+        )
         
         # Remove dead connections
-        for conn in dead_connections:
-            state.websocket_connections.remove(conn)
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                state.websocket_connections.discard(connection)
 
 # ============================================================================
 # Chat API Endpoints
@@ -243,22 +352,24 @@ async def broadcast_message(message: Dict[str, Any]):
 async def send_chat_message(request: ChatRequest, background_tasks: BackgroundTasks):
     """Send a message to the AI and get response"""
     try:
+        now = datetime.now()
+        
         # Generate session ID if not provided
-        session_id = request.session_id or f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{len(state.active_queries):03d}"
+        session_id = request.session_id or f"{now.strftime('%Y%m%d_%H%M%S')}_{len(state.active_queries):03d}"
         
         # Create user message
         user_message = ChatMessage(
-            id=f"msg_{datetime.now().timestamp()}",
+            id=f"msg_{now.timestamp()}",
             role="user",
             content=request.message,
-            timestamp=datetime.now().isoformat()
+            timestamp=now.isoformat()
         )
         
         # Broadcast user message immediately
         await broadcast_message({
             "type": "chat_message",
             "session_id": session_id,
-            "message": user_message.dict()
+            "message": user_message.model_dump()
         })
         
         # Process query in background
@@ -283,17 +394,25 @@ async def process_chat_query(session_id: str, user_query: str):
             "status": "thinking"
         })
         
-        # Run the query (this is synchronous, so we run it in a thread)
-        import asyncio
-        loop = asyncio.get_event_loop()
+        # Forward Claude's output to the clients as it is generated
+        async def send_delta(delta: str, iteration: int):
+            await broadcast_message({
+                "type": "chat_delta",
+                "session_id": session_id,
+                "iteration": iteration,
+                "delta": delta
+            })
         
-        def run_query():
-            return state.ai_system.query_files(user_query, session_id)
+        # Run the query on the event loop - Claude calls are awaited, not run in a worker thread
+        result, iterations, files_accessed = await state.ai_system.query_files(user_query, session_id, on_delta=send_delta)
         
-        result, iterations, files_accessed = await loop.run_in_executor(None, run_query)
+        # Save session with files accessed info, off the event loop
+        session_file = await asyncio.to_thread(
+            state.ai_system.save_session, user_query, iterations, result, session_id, files_accessed
+        )
         
-        # Save session with files accessed info
-        session_file = state.ai_system.save_session(user_query, iterations, result, session_id, files_accessed)
+        now = datetime.now()
+        now_iso = now.isoformat()
         
         # Also save in frontend format
         messages = [
@@ -301,30 +420,30 @@ async def process_chat_query(session_id: str, user_query: str):
                 "id": f"msg_{session_id}_user",
                 "role": "user",
                 "content": user_query,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now_iso
             },
             {
                 "id": f"msg_{session_id}_assistant", 
                 "role": "assistant",
                 "content": result,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": now_iso
             }
         ]
-        save_chat_session(session_id, messages, user_query)
+        await save_chat_session(session_id, messages, user_query, now_iso)
         
         # Create AI response message
         ai_message = ChatMessage(
-            id=f"msg_{datetime.now().timestamp()}",
+            id=f"msg_{now.timestamp()}",
             role="assistant",
             content=result,
-            timestamp=datetime.now().isoformat()
+            timestamp=now_iso
         )
         
         # Broadcast AI response
         await broadcast_message({
             "type": "chat_message",
             "session_id": session_id,
-            "message": ai_message.dict()
+            "message": ai_message.model_dump()
         })
         
         # Broadcast completion
@@ -347,7 +466,7 @@ async def process_chat_query(session_id: str, user_query: str):
 async def load_chat_sessions_api():
     """Load all saved chat sessions for the frontend"""
     try:
-        sessions = load_chat_sessions()
+        sessions = await load_chat_sessions()
         return {"sessions": sessions}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading chat sessions: {str(e)}")
@@ -363,7 +482,7 @@ async def save_chat_session_api(request: dict):
         if not session_id:
             raise HTTPException(status_code=400, detail="session_id is required")
         
-        chat_file = save_chat_session(session_id, messages, user_query)
+        chat_file = await save_chat_session(session_id, messages, user_query)
         
         if chat_file:
             return {"message": "Chat session saved successfully", "file": str(chat_file)}
@@ -380,18 +499,19 @@ async def get_chat_sessions():
         if not sessions_dir.exists():
             return []
         
+        entries = scan_session_files(sessions_dir, "session_")
         sessions = []
-        for session_file in sessions_dir.glob("session_*.json"):
+        for (session_file, stat), session_data in zip(entries, await load_session_files(entries)):
             try:
-                with open(session_file, 'r', encoding='utf-8') as f:
-                    session_data = json.load(f)
+                if isinstance(session_data, Exception):
+                    raise session_data
                 
                 sessions.append(SessionInfo(
                     id=session_data.get('session_id', session_file.stem),
                     name=f"{session_file.name}",
                     date=session_data.get('timestamp', ''),
                     messageCount=session_data.get('total_iterations', 0),
-                    size=f"{session_file.stat().st_size / 1024:.1f} KB",
+                    size=f"{stat.st_size / 1024:.1f} KB",
                     filesAccessed=session_data.get('files_accessed', [])
                 ))
             except Exception as e:
@@ -413,8 +533,11 @@ async def get_session_details(session_id: str):
         if not session_file.exists():
             raise HTTPException(status_code=404, detail="Session not found")
         
-        with open(session_file, 'r', encoding='utf-8') as f:
-            session_data = json.load(f)
+        session_data = await read_json(session_file)
+        
+        # Newer sessions keep only the prompt hash; return the full prompt as before
+        if resolve_system_prompt is not None:
+            await asyncio.to_thread(resolve_system_prompt, session_data, session_file.parent)
         
         return session_data
         
@@ -431,7 +554,8 @@ async def delete_session(session_id: str):
         if not session_file.exists():
             raise HTTPException(status_code=404, detail="Session not found")
         
-        session_file.unlink()
+        await aiofiles.os.remove(session_file)
+        invalidate_session_cache(session_file)
         return {"message": "Session deleted successfully"}
         
     except FileNotFoundError:
@@ -452,17 +576,20 @@ async def list_files():
             return []
         
         files = []
-        for file_path in files_dir.iterdir():
-            if file_path.is_file() and file_path.suffix.lower() in ['.txt', '.xml', '.pdf']:
-                files.append(FileInfo(
-                    id=file_path.name,
-                    name=file_path.name,
-                    originalName=file_path.name,
-                    format=file_path.suffix[1:].lower(),
-                    size=f"{file_path.stat().st_size / 1024:.1f} KB",
-                    date=datetime.fromtimestamp(file_path.stat().st_mtime).isoformat(),
-                    path=str(file_path)
-                ))
+        with os.scandir(files_dir) as it:
+            for entry in it:
+                suffix = os.path.splitext(entry.name)[1].lower()
+                if suffix in ('.txt', '.xml', '.pdf') and entry.is_file():
+                    stat = entry.stat()
+                    files.append(FileInfo(
+                        id=entry.name,
+                        name=entry.name,
+                        originalName=entry.name,
+                        format=suffix[1:],
+                        size=f"{stat.st_size / 1024:.1f} KB",
+                        date=datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                        path=str(files_dir / entry.name)
+                    ))
         
         return files
         
@@ -484,15 +611,18 @@ async def upload_file(file: UploadFile = File(...)):
         files_dir = Path("files_to_query")
         files_dir.mkdir(exist_ok=True)
         
-        # Save file
+        # Save file in large chunks without blocking the event loop
         file_path = files_dir / file.filename
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        size = 0
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await buffer.write(chunk)
+                size += len(chunk)
         
         return {
             "message": "File uploaded successfully",
             "filename": file.filename,
-            "size": file_path.stat().st_size
+            "size": size
         }
         
     except Exception as e:
@@ -573,15 +703,29 @@ async def delete_file(filename: str):
 # System Prompt API Endpoints
 # ============================================================================
 
+# Page-sized buffer for the small prompt file
+PROMPT_IO_BUFFER = 4096
+
+def read_system_prompt_file() -> str:
+    """Read the system prompt file, reusing the cached text while it is unchanged"""
+    global _system_prompt_cache
+    mtime_ns = SYSTEM_PROMPT_PATH.stat().st_mtime_ns
+    if _system_prompt_cache is None or _system_prompt_cache[0] != mtime_ns:
+        with open(SYSTEM_PROMPT_PATH, 'r', encoding='utf-8', buffering=PROMPT_IO_BUFFER) as f:
+            _system_prompt_cache = (mtime_ns, f.read())
+    return _system_prompt_cache[1]
+
+def write_system_prompt_file(prompt: str):
+    with open(SYSTEM_PROMPT_PATH, 'w', encoding='utf-8', buffering=PROMPT_IO_BUFFER) as f:
+        f.write(prompt)
+
 @app.get("/api/system-prompt")
 async def get_system_prompt():
     """Get current system prompt"""
     try:
-        prompt_file = Path("system_prompt.txt")
-        if prompt_file.exists():
-            with open(prompt_file, 'r', encoding='utf-8') as f:
-                prompt = f.read()
-        else:
+        try:
+            prompt = await asyncio.to_thread(read_system_prompt_file)
+        except FileNotFoundError:
             prompt = "Default system prompt not found"
         
         return {"prompt": prompt}
@@ -593,13 +737,12 @@ async def get_system_prompt():
 async def update_system_prompt(request: SystemPromptUpdate):
     """Update system prompt"""
     try:
-        prompt_file = Path("system_prompt.txt")
-        with open(prompt_file, 'w', encoding='utf-8') as f:
-            f.write(request.prompt)
+        await asyncio.to_thread(write_system_prompt_file, request.prompt)
         
-        # Reload AI system with new prompt
+        # Reload AI system with new prompt (stripped the same way load_system_prompt does,
+        # so the prompt bytes sent to Claude don't change after a restart)
         if state.ai_system:
-            state.ai_system.system_prompt = request.prompt
+            state.ai_system.system_prompt = request.prompt.strip()
         
         return {"message": "System prompt updated successfully"}
         
@@ -619,48 +762,65 @@ async def start_migration(background_tasks: BackgroundTasks):
     background_tasks.add_task(run_migration)
     return {"message": "Migration started"}
 
+# Seconds between coalesced migration progress broadcasts
+PROGRESS_FLUSH_INTERVAL = 0.25
+
 async def run_migration():
     """Run the migration process with progress tracking"""
     try:
         state.migration_status.isRunning = True
         state.migration_status.progress = 0
-        state.migration_status.logs = []
+        state.migration_status.logs = deque(maxlen=MIGRATION_LOG_LIMIT)
         state.migration_status.completed = False
         
-        # Simulate migration steps
-        steps = [
-            "Initializing migration...",
-            "Reading session files...",
-            "Processing data...", 
-            "Creating Excel file...",
-            "Migration completed!"
-        ]
+        loop = asyncio.get_running_loop()
+        pending_broadcasts = set()
+        flush_handle = None
+        cycle_timestamp = None
+        # Entries not broadcast yet; clients append each batch to what they have
+        unsent_logs = []
         
-        for i, step in enumerate(steps):
-            # Add log entry
-            log_entry = {
-                "timestamp": datetime.now().isoformat(),
-                "message": step,
-                "type": "info"
-            }
-            state.migration_status.logs.append(log_entry)
-            
-            # Update progress
-            state.migration_status.progress = int((i + 1) / len(steps) * 100)
-            
-            # Broadcast progress
-            await broadcast_message({
+        def add_log(entry: Dict[str, Any]):
+            state.migration_status.logs.append(entry)
+            unsent_logs.append(entry)
+        
+        def take_unsent_logs() -> List[Dict[str, Any]]:
+            logs = unsent_logs[:]
+            unsent_logs.clear()
+            return logs
+        
+        def flush_progress():
+            nonlocal flush_handle
+            flush_handle = None
+            # Broadcast without holding up the migration
+            task = asyncio.create_task(broadcast_message({
                 "type": "migration_progress",
                 "progress": state.migration_status.progress,
-                "logs": state.migration_status.logs
-            })
+                "logs": take_unsent_logs()
+            }))
+            pending_broadcasts.add(task)
+            task.add_done_callback(pending_broadcasts.discard)
+        
+        async def report_progress(progress: int, message: str):
+            nonlocal flush_handle, cycle_timestamp
+            # Coalesce updates into at most one broadcast per interval;
+            # entries within one interval share its timestamp
+            if flush_handle is None:
+                cycle_timestamp = datetime.now().isoformat()
+                flush_handle = loop.call_later(PROGRESS_FLUSH_INTERVAL, flush_progress)
             
-            # Simulate work
-            await asyncio.sleep(1)
+            state.migration_status.progress = progress
+            add_log({
+                "timestamp": cycle_timestamp,
+                "message": message,
+                "type": "info"
+            })
+        
+        await report_progress(0, "Initializing migration...")
         
-        # Actually run migration
+        # Run migration, progress is reported at real milestones
         try:
-            migrate_sessions_to_excel()
+            await migrate_sessions_to_excel(progress_cb=report_progress)
             state.migration_status.completed = True
             
             final_log = {
@@ -668,7 +828,7 @@ async def run_migration():
                 "message": "Migration completed successfully!",
                 "type": "success"
             }
-            state.migration_status.logs.append(final_log)
+            add_log(final_log)
             
         except Exception as e:
             error_log = {
@@ -676,15 +836,21 @@ async def run_migration():
                 "message": f"Migration failed: {str(e)}",
                 "type": "error"
             }
-            state.migration_status.logs.append(error_log)
+            add_log(error_log)
         
         state.migration_status.isRunning = False
+        state.migration_status.progress = 100
+        
+        # The final status carries the remaining entries, so drop a pending flush
+        if flush_handle is not None:
+            flush_handle.cancel()
+        await asyncio.gather(*pending_broadcasts)
         
         # Broadcast final status
         await broadcast_message({
             "type": "migration_complete",
             "completed": state.migration_status.completed,
-            "logs": state.migration_status.logs
+            "logs": take_unsent_logs()
         })
         
     except Exception as e:
@@ -696,102 +862,132 @@ async def get_migration_status():
     """Get current migration status"""
     return state.migration_status
 
+async def flush_pending_excel_rows():
+    """Write sessions queued in the sidecar rows file into the workbook"""
+    if rebuild_xlsx_from_jsonl is not None:
+        await asyncio.to_thread(rebuild_xlsx_from_jsonl, EXCEL_PATH)
+
+# Read size per send when streaming the Excel download
+EXCEL_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Internal nginx location for the Excel file (e.g. /internal/query_tracking.xlsx)
+EXCEL_ACCEL_REDIRECT = os.getenv("EXCEL_ACCEL_REDIRECT")
+
 @app.get("/api/evaluation/download")
 async def download_excel():
     """Download the Excel evaluation file"""
     try:
-        excel_path = Path("query_tracking.xlsx")
-        if not excel_path.exists():
+        if not EXCEL_PATH.exists():
             raise HTTPException(status_code=404, detail="Excel file not found. Run migration first.")
         
-        return FileResponse(
-            path=str(excel_path),
+        await flush_pending_excel_rows()
+        
+        headers = {"Cache-Control": "no-cache"}
+        
+        # Behind nginx, hand the transfer to it so the file is sent with sendfile
+        if EXCEL_ACCEL_REDIRECT:
+            headers["X-Accel-Redirect"] = EXCEL_ACCEL_REDIRECT
+            headers["Content-Disposition"] = 'attachment; filename="evaluation_report.xlsx"'
+            return Response(
+                headers=headers,
+                media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+        
+        # Pass the stat along so Starlette doesn't stat the file again
+        response = FileResponse(
+            path=str(EXCEL_PATH),
             filename="evaluation_report.xlsx",
-            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            headers=headers,
+            stat_result=EXCEL_PATH.stat()
         )
+        response.chunk_size = EXCEL_DOWNLOAD_CHUNK_SIZE
+        return response
         
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Excel file not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error downloading Excel file: {str(e)}")
 
+def preview_row(row, columns):
+    """Convert one worksheet row into a JSON-safe dict keyed by column name"""
+    row_dict = {}
+    for i, value in enumerate(row):
+        if i < len(columns):
+            # Handle various Excel data types that might not be JSON serializable
+            if value is None:
+                row_dict[columns[i]] = None
+            elif isinstance(value, (int, float, str, bool)):
+                # Check for NaN or infinite values
+                if isinstance(value, float) and (value != value or value == float('inf') or value == float('-inf')):
+                    row_dict[columns[i]] = None
+                else:
+                    row_dict[columns[i]] = value
+            else:
+                # Convert other types to string
+                row_dict[columns[i]] = str(value)
+    return row_dict
+
+# (mtime_ns, preview) of the last parsed Excel file
+_preview_cache: Optional[tuple] = None
+
+def read_excel_preview() -> Dict[str, Any]:
+    """Parse the column names and first 50 rows of the Excel file"""
+    if openpyxl is None:
+        raise HTTPException(status_code=500, detail="openpyxl not available for Excel reading")
+    
+    # Read-only streams the sheet XML instead of building every cell
+    workbook = openpyxl.load_workbook(str(EXCEL_PATH), read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        
+        # Files saved without a dimension record (or a stale A1:A1 one) are sized by scanning
+        if sheet.max_row is None or sheet.calculate_dimension() == "A1:A1":
+            sheet.reset_dimensions()
+        
+        # Get column names from first row
+        columns = list(next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ()))
+        
+        # Get data rows (limit to 50)
+        data = [
+            preview_row(row, columns)
+            for row in sheet.iter_rows(min_row=2, max_row=51, values_only=True)
+        ]
+        
+        total_rows = sheet.max_row
+        if total_rows is None:
+            total_rows = 1 + sum(1 for _ in sheet.iter_rows(min_row=2, max_col=1, values_only=True))
+    finally:
+        workbook.close()
+    
+    return {
+        "columns": columns,
+        "data": data,
+        "total_rows": total_rows - 1,  # Subtract header row
+        "preview_rows": len(data),
+        "file_exists": True
+    }
+
 @app.get("/api/evaluation/preview")
-async def preview_excel():
+async def preview_excel(request: Request):
     """Preview the Excel evaluation file content"""
+    global _preview_cache
     try:
-        excel_path = Path("query_tracking.xlsx")
-        if not excel_path.exists():
+        if not EXCEL_PATH.exists():
             raise HTTPException(status_code=404, detail="Excel file not found. Run migration first.")
         
-        # Try to read Excel file using pandas
-        try:
-            import pandas as pd
-            
-            # Read the Excel file
-            df = pd.read_excel(str(excel_path))
-            
-            # Handle NaN values - replace with None for JSON serialization
-            df = df.fillna(value=None)
-            
-            # Convert to records (list of dictionaries)
-            records = df.to_dict('records')
-            
-            # Limit to first 50 rows for preview
-            preview_records = records[:50]
-            
-            # Get column names
-            columns = df.columns.tolist()
-            
-            return {
-                "columns": columns,
-                "data": preview_records,
-                "total_rows": len(records),
-                "preview_rows": len(preview_records),
-                "file_exists": True
-            }
-            
-        except ImportError:
-            # Fallback: try to read with openpyxl directly
-            try:
-                import openpyxl
-                workbook = openpyxl.load_workbook(str(excel_path))
-                sheet = workbook.active
-                
-                # Get column names from first row
-                columns = [cell.value for cell in sheet[1]]
-                
-                # Get data rows (limit to 50)
-                data = []
-                for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), 1):
-                    if row_num > 50:
-                        break
-                    row_dict = {}
-                    for i, value in enumerate(row):
-                        if i < len(columns):
-                            # Handle various Excel data types that might not be JSON serializable
-                            if value is None:
-                                row_dict[columns[i]] = None
-                            elif isinstance(value, (int, float, str, bool)):
-                                # Check for NaN or infinite values
-                                if isinstance(value, float) and (value != value or value == float('inf') or value == float('-inf')):
-                                    row_dict[columns[i]] = None
-                                else:
-                                    row_dict[columns[i]] = value
-                            else:
-                                # Convert other types to string
-                                row_dict[columns[i]] = str(value)
-                    data.append(row_dict)
-                
-                return {
-                    "columns": columns,
-                    "data": data,
-                    "total_rows": sheet.max_row - 1,  # Subtract header row
-                    "preview_rows": len(data),
-                    "file_exists": True
-                }
-                
-            except ImportError:
-                raise HTTPException(status_code=500, detail="Neither pandas nor openpyxl available for Excel reading")
+        await flush_pending_excel_rows()
+        
+        # The file only changes when sessions are written, so its mtime identifies the preview
+        mtime_ns = EXCEL_PATH.stat().st_mtime_ns
+        etag = f'W/"{mtime_ns}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        if _preview_cache is None or _preview_cache[0] != mtime_ns:
+            _preview_cache = (mtime_ns, await asyncio.to_thread(read_excel_preview))
+        
+        return ORJSONResponse(_preview_cache[1], headers={"ETag": etag})
         
     except FileNotFoundError:
         return {
@@ -840,7 +1036,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=False,  # Disabled to prevent interruption during AI processing
-        reload_dirs=["./"],
-        reload_excludes=["temp_scripts/*", "query_sessions/*", "files_to_query/*", "__pycache__/*", "frontend_chats/*"],
-        log_level="info"
+        log_level="info",
+        **server_options()  # uvloop/httptools when installed, one worker by default
     )
@@ -6,51 +6,118 @@ Used by interactive system to automatically log each session
 
 import json
 import os
+import re
+import threading
 from pathlib import Path
 from openpyxl import load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
 from datetime import datetime
 import hashlib
+from functools import lru_cache
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Excel tracking file (relative to the working directory)
+EXCEL_PATH = Path("query_tracking.xlsx")
+
+# Columns A-G are written by this module and never hold formulas; H onward are filled in by hand
+GENERATED_COLUMNS = 7
+
+# Sheet holding the full text of each distinct system prompt, keyed by hash
+PROMPT_CATALOG_SHEET = "PromptCatalog"
+PROMPT_CATALOG_HEADER = ["Prompt Hash", "System Prompt"]
+
+# Directory beside the session files holding each distinct system prompt as <hash>.txt
+PROMPT_STORE_DIR = "prompts"
+
+# Maximum characters Excel stores in one cell
+EXCEL_CELL_LIMIT = 32767
+
+# Serializes sidecar appends against workbook rebuilds
+_excel_lock = threading.Lock()
+
+# (session IDs, prompt hashes) queued in each sidecar file, loaded on first use
+_pending_index = {}
+
+# (session IDs, prompt hashes) in each workbook, keyed with its mtime_ns, loaded on first use
+_workbook_index = {}
+
+# Key phrases identifying each prompt version, in priority order
+PROMPT_VERSION_MARKERS = (
+    ("two-phase process", "v2.0 (Two-Phase)"),
+    ("critical rule", "v1.5 (Critical Rule)"),
+    ("script results are authoritative", "v1.2 (Authoritative)"),
+    ("query_complete", "v1.1 (Query Complete)"),
+    ("specialized in analyzing", "v1.0 (Basic)"),
+)
+
+# Finds every marker in one case-insensitive pass over the prompt
+PROMPT_VERSION_PATTERN = re.compile(
+    "|".join(re.escape(marker) for marker, _ in PROMPT_VERSION_MARKERS), re.IGNORECASE
+)
+
+def find_prompt_version(system_prompt):
+    """Version label of the highest-priority marker in the prompt, or None"""
+    found = {match.group().lower() for match in PROMPT_VERSION_PATTERN.finditer(system_prompt)}
+    for marker, version in PROMPT_VERSION_MARKERS:
+        if marker in found:
+            return version
+    return None
+
+@lru_cache(maxsize=32)
 def get_system_prompt_version(system_prompt):
     """Get a human-readable version identifier for the system prompt"""
     if not system_prompt:
         return "N/A"
     
-    prompt_lower = system_prompt.lower()
-    
     # Identify different prompt versions based on key phrases
-    if "two-phase process" in prompt_lower:
-        return "v2.0 (Two-Phase)"
-    elif "critical rule" in prompt_lower:
-        return "v1.5 (Critical Rule)"
-    elif "script results are authoritative" in prompt_lower:
-        return "v1.2 (Authoritative)"
-    elif "query_complete" in prompt_lower:
-        return "v1.1 (Query Complete)"
-    elif "specialized in analyzing" in prompt_lower:
-        return "v1.0 (Basic)"
-    else:
-        # Fallback to hash for unknown versions
-        hash_val = hashlib.md5(system_prompt.encode()).hexdigest()[:8]
-        return f"Custom ({hash_val})"
+    version = find_prompt_version(system_prompt)
+    if version:
+        return version
+    
+    # Fallback to hash for unknown versions
+    hash_val = hashlib.blake2b(system_prompt.encode('utf-8', 'ignore'), digest_size=4).hexdigest()
+    return f"Custom ({hash_val})"
 
-def extract_script_content(iterations):
-    """Extract the actual script content from iterations"""
-    all_scripts = []
+def extract_script_content_for_excel(iterations):
+    """
+    Script content of the executed iterations, cleaned for an Excel cell
+    Each script is cleaned on its own and collection stops once the cell
+    limit is reached, so long sessions are never joined and rescanned
+    """
+    pieces = []
+    cleaned = []
+    cleaned_len = -3  # the first piece has no ' | ' separator in front of it
     
     for i, iteration in enumerate(iterations, 1):
-        if iteration.get('script_executed', False):
-            exec_result = iteration.get('execution_result', {})
-            script_content = exec_result.get('script_content', '')
-            if script_content:
-                script_header = f"\n=== Iteration {i} Script ==="
-                all_scripts.append(script_header)
-                all_scripts.append(script_content)
-    
-    if all_scripts:
-        return '\n'.join(all_scripts)
-    else:
+        if not iteration.get('script_executed', False):
+            continue
+        exec_result = iteration.get('execution_result')
+        script_content = exec_result.get('script_content', '') if exec_result else ''
+        if not script_content:
+            continue
+        
+        header = f"\n=== Iteration {i} Script ==="
+        for piece in (header.lstrip() if not pieces else header, script_content):
+            pieces.append(piece)
+            # Headers are never blank, so everything up to the last non-blank
+            # character of this piece survives the final strip()
+            kept = piece.rstrip().translate(EXCEL_TEXT_TABLE)
+            if kept and cleaned_len + 3 + len(kept) > 1000:
+                return ' | '.join(cleaned + [kept])[:997] + "..."
+            cleaned.append(piece.translate(EXCEL_TEXT_TABLE))
+            cleaned_len += 3 + len(cleaned[-1])
+    
+    if not pieces:
         return "No scripts executed"
+    return clean_text_for_excel('\n'.join(pieces))
+
+# Newlines become visible separators, carriage returns are dropped
+EXCEL_TEXT_TABLE = str.maketrans({'\n': ' | ', '\r': None})
 
 def clean_text_for_excel(text):
     """Clean text to be Excel-friendly"""
@@ -60,8 +127,15 @@ def clean_text_for_excel(text):
     # Convert to string and limit length for Excel readability
     text = str(text).strip()
     
-    # Replace problematic characters
-    text = text.replace('\n', ' | ').replace('\r', '')
+    # Long text gets cut anyway, so translate only the head that can survive -
+    # unless dropped carriage returns leave that head too short to decide
+    if len(text) > 1001:
+        head = text[:1001].translate(EXCEL_TEXT_TABLE)
+        if len(head) > 1000:
+            return head[:997] + "..."
+    
+    # Replace problematic characters in one pass
+    text = text.translate(EXCEL_TEXT_TABLE)
     
     # Limit length to avoid Excel issues
     if len(text) > 1000:
@@ -69,9 +143,151 @@ def clean_text_for_excel(text):
     
     return text
 
-def append_session_to_excel(session_data, excel_path="query_tracking.xlsx"):
+@lru_cache(maxsize=32)
+def read_stored_prompt(prompt_path):
+    """Text of a stored system prompt; most sessions share a few, so each is read from disk once"""
+    try:
+        return Path(prompt_path).read_text(encoding='utf-8')
+    except FileNotFoundError:
+        return ''
+
+def resolve_system_prompt(session_data, sessions_dir):
+    """
+    Fill in session_data['system_prompt'] for sessions that only store its hash
+    Older session files embed the full prompt and are returned unchanged
+    """
+    prompt_hash = session_data.get('system_prompt_hash')
+    if prompt_hash and 'system_prompt' not in session_data:
+        session_data['system_prompt'] = read_stored_prompt(str(Path(sessions_dir) / PROMPT_STORE_DIR / f"{prompt_hash}.txt"))
+    return session_data
+
+def loads_json(data):
+    """Parse JSON bytes, with orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps_json(obj):
+    """Serialize to compact UTF-8 JSON bytes, with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def rows_path_for(excel_path):
+    """Sidecar file holding rows not yet written into the workbook"""
+    return Path(excel_path).with_suffix('.rows.jsonl')
+
+@lru_cache(maxsize=32)
+def prompt_hash(system_prompt):
+    """Short content hash identifying a system prompt in the PromptCatalog sheet"""
+    return hashlib.blake2b(system_prompt.encode('utf-8', 'ignore'), digest_size=8).hexdigest()
+
+def prompt_column_value(system_prompt):
+    """Column C value: prompt version and hash (the full text is in the PromptCatalog sheet)"""
+    if not system_prompt:
+        return ""
+    return f"{get_system_prompt_version(system_prompt)} [{prompt_hash(system_prompt)}]"
+
+def catalog_row(system_prompt):
+    """PromptCatalog row for a system prompt"""
+    return [prompt_hash(system_prompt), system_prompt[:EXCEL_CELL_LIMIT]]
+
+def build_excel_row(session_data):
+    """Build the A-G column values for one session"""
+    session_id = session_data.get('session_id', '')
+    user_prompt = clean_text_for_excel(session_data.get('user_query', ''))
+    system_prompt = session_data.get('system_prompt', '')
+    system_prompt_label = prompt_column_value(system_prompt)
+    
+    # Files accessed
+    files_accessed = session_data.get('files_accessed', [])
+    if isinstance(files_accessed, list):
+        files_str = ", ".join(files_accessed) if files_accessed else "None detected"
+    else:
+        files_str = str(files_accessed)
+    files_str = clean_text_for_excel(files_str)
+    
+    # Number of iterations
+    num_iterations = session_data.get('total_iterations', 0)
+    
+    # Script content - actual code
+    iterations = session_data.get('iterations', [])
+    script_content_clean = extract_script_content_for_excel(iterations)
+    
+    # AI final output
+    final_output = clean_text_for_excel(session_data.get('final_answer', ''))
+    
+    # A: Session ID, B: User Prompt, C: System Prompt (version + hash), D: Files Accessed,
+    # E: Number of Iterations, F: Script Content, G: AI Final Output
+    # H-J left empty for manual entry
+    return [session_id, user_prompt, system_prompt_label, files_str,
+            num_iterations, script_content_clean, final_output]
+
+def pending_index(rows_path):
+    """
+    (session IDs, prompt hashes) already queued in the sidecar file, cached per process
+    Sidecar lines are either a row (JSON list) or a PromptCatalog entry (JSON object)
+    """
+    index = _pending_index.get(rows_path)
+    if index is None:
+        index = (set(), set())
+        if rows_path.exists():
+            with open(rows_path, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        record = loads_json(line)
+                        if isinstance(record, dict):
+                            index[1].add(record['prompt_hash'])
+                        else:
+                            index[0].add(record[0])
+        _pending_index[rows_path] = index
+    return index
+
+def workbook_index(excel_path):
+    """
+    (session IDs in column A, prompt hashes in the PromptCatalog sheet) of the workbook
+    Scanned once in read-only mode and rescanned only if the file changes
+    """
+    excel_path = Path(excel_path)
+    mtime_ns = excel_path.stat().st_mtime_ns
+    cached = _workbook_index.get(excel_path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+    
+    session_ids = set()
+    prompt_hashes = set()
+    wb = load_workbook(excel_path, read_only=True)
+    try:
+        for (value,) in wb.active.iter_rows(min_row=2, max_col=1, values_only=True):
+            if value:
+                session_ids.add(value)
+        if PROMPT_CATALOG_SHEET in wb.sheetnames:
+            for (value,) in wb[PROMPT_CATALOG_SHEET].iter_rows(min_row=2, max_col=1, values_only=True):
+                if value:
+                    prompt_hashes.add(value)
+    finally:
+        wb.close()
+    _workbook_index[excel_path] = (mtime_ns, (session_ids, prompt_hashes))
+    return session_ids, prompt_hashes
+
+def append_session_rows_jsonl(session_data, rows_path, new_prompt=None):
+    """
+    Append one session row to the sidecar file (no workbook I/O)
+    new_prompt is queued for the PromptCatalog sheet when given
+    """
+    row = build_excel_row(session_data)
+    with open(rows_path, 'ab') as f:
+        if new_prompt:
+            hash_val, text = catalog_row(new_prompt)
+            f.write(dumps_json({'prompt_hash': hash_val, 'prompt': text}) + b'\n')
+        f.write(dumps_json(row) + b'\n')
+    return row
+
+def append_session_to_excel(session_data, excel_path=EXCEL_PATH):
     """
     Append a single session to the Excel tracking file
+    Rows are queued in a JSONL sidecar and written into the workbook by
+    rebuild_xlsx_from_jsonl(), so an append never loads or saves the workbook
     Returns True if successful, False otherwise
     """
     try:
@@ -80,56 +296,29 @@ def append_session_to_excel(session_data, excel_path="query_tracking.xlsx"):
             print(f"Warning: Excel tracking file {excel_path} not found")
             return False
         
-        # Load Excel file
-        wb = load_workbook(excel_path)
-        ws = wb.active
-        
-        # Check if session already exists
+        rows_path = rows_path_for(excel_path)
         session_id = session_data.get('session_id', '')
-        for row in range(2, ws.max_row + 1):
-            if ws.cell(row=row, column=1).value == session_id:
-                print(f"Session {session_id} already exists in Excel, skipping")
-                return True
-        
-        # Extract and clean data
-        user_prompt = clean_text_for_excel(session_data.get('user_query', ''))
         system_prompt = session_data.get('system_prompt', '')
-        system_prompt_full = clean_text_for_excel(system_prompt)  # Full text
-        
-        # Files accessed
-        files_accessed = session_data.get('files_accessed', [])
-        if isinstance(files_accessed, list):
-            files_str = ", ".join(files_accessed) if files_accessed else "None detected"
-        else:
-            files_str = str(files_accessed)
-        files_str = clean_text_for_excel(files_str)
-        
-        # Number of iterations
-        num_iterations = session_data.get('total_iterations', 0)
         
-        # Script content - actual code
-        iterations = session_data.get('iterations', [])
-        script_content = extract_script_content(iterations)
-        script_content_clean = clean_text_for_excel(script_content)
-        
-        # AI final output
-        final_output = clean_text_for_excel(session_data.get('final_answer', ''))
-        
-        # Find next empty row
-        next_row = ws.max_row + 1
-        
-        # Write data to Excel
-        ws.cell(row=next_row, column=1, value=session_id)  # A: Session ID
-        ws.cell(row=next_row, column=2, value=user_prompt)  # B: User Prompt
-        ws.cell(row=next_row, column=3, value=system_prompt_full)  # C: System Prompt (Full Text)
-        ws.cell(row=next_row, column=4, value=files_str)  # D: Files Accessed
-        ws.cell(row=next_row, column=5, value=num_iterations)  # E: Number of Iterations
-        ws.cell(row=next_row, column=6, value=script_content_clean)  # F: Script Content (Full Code)
-        ws.cell(row=next_row, column=7, value=final_output)  # G: AI Final Output
-        # H-J left empty for manual entry
+        with _excel_lock:
+            # Check if session already exists
+            pending_ids, pending_hashes = pending_index(rows_path)
+            workbook_ids, workbook_hashes = workbook_index(excel_path)
+            if session_id in pending_ids or session_id in workbook_ids:
+                print(f"Session {session_id} already exists in Excel, skipping")
+                return True
+            
+            # Only the first session using a prompt adds its full text to the catalog
+            new_prompt = None
+            if system_prompt:
+                hash_val = prompt_hash(system_prompt)
+                if hash_val not in pending_hashes and hash_val not in workbook_hashes:
+                    new_prompt = system_prompt
+                    pending_hashes.add(hash_val)
+            
+            append_session_rows_jsonl(session_data, rows_path, new_prompt)
+            pending_ids.add(session_id)
         
-        # Save the file
-        wb.save(excel_path)
         print(f"SUCCESS: Added session {session_id} to Excel tracking")
         return True
         
@@ -137,13 +326,115 @@ def append_session_to_excel(session_data, excel_path="query_tracking.xlsx"):
         print(f"Error appending session to Excel: {e}")
         return False
 
-def append_session_from_json(json_file_path, excel_path="query_tracking.xlsx"):
+def text_cell(ws, value):
+    """Cell for appending; strings are stored as text, never parsed as formulas (e.g. "=== Iteration 1 Script ===")"""
+    cell = WriteOnlyCell(ws, value=value)
+    if isinstance(value, str):
+        cell.data_type = 's'
+    return cell
+
+def text_row(ws, values):
+    """Row of text_cell()s, ready for ws.append()"""
+    return [text_cell(ws, value) for value in values]
+
+def bold_row(ws, values):
+    """Header row of cells in bold"""
+    row = []
+    for value in values:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = Font(bold=True)
+        row.append(cell)
+    return row
+
+def repair_generated_text(ws):
+    """Store generated A-G strings that an earlier save turned into formulas as text again"""
+    for row in ws.iter_rows(min_row=2, max_col=GENERATED_COLUMNS):
+        for cell in row:
+            if cell.data_type == 'f' and isinstance(cell.value, str):
+                cell.data_type = 's'
+
+def open_tracking_workbook(excel_path):
+    """
+    Load the tracking workbook to append to it in place - every sheet, style, column width
+    and hand-entered value or formula in the evaluation columns is kept as it is
+    Returns (workbook, tracking sheet, catalog sheet, session IDs, prompt hashes)
+    """
+    wb = load_workbook(excel_path)
+    ws = wb.active
+    repair_generated_text(ws)
+    session_ids = {row[0] for row in ws.iter_rows(min_row=2, max_col=1, values_only=True) if row[0]}
+    
+    if PROMPT_CATALOG_SHEET in wb.sheetnames:
+        catalog_ws = wb[PROMPT_CATALOG_SHEET]
+    else:
+        catalog_ws = wb.create_sheet(PROMPT_CATALOG_SHEET)
+        catalog_ws.column_dimensions['A'].width = 20.0
+        catalog_ws.column_dimensions['B'].width = 120.0
+        catalog_ws.append(bold_row(catalog_ws, PROMPT_CATALOG_HEADER))
+    prompt_hashes = {row[0] for row in catalog_ws.iter_rows(min_row=2, max_col=1, values_only=True) if row[0]}
+    
+    return wb, ws, catalog_ws, session_ids, prompt_hashes
+
+def save_workbook_atomic(workbook, excel_path):
+    """Save next to the tracking file and swap it in, so a failed save never leaves a half-written workbook"""
+    excel_path = Path(excel_path)
+    tmp_path = excel_path.with_name(excel_path.name + ".new")
+    try:
+        workbook.save(tmp_path)
+        os.replace(tmp_path, excel_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+def rebuild_xlsx_from_jsonl(excel_path=EXCEL_PATH):
+    """
+    Write rows queued in the sidecar file into the Excel tracking file
+    The workbook is loaded and saved once for the whole queue, appending in place
+    Returns the number of rows added
+    """
+    rows_path = rows_path_for(excel_path)
+    
+    with _excel_lock:
+        if not rows_path.exists() or rows_path.stat().st_size == 0:
+            return 0
+        
+        wb, ws, catalog_ws, _, _ = open_tracking_workbook(excel_path)
+        
+        added = 0
+        with open(rows_path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    record = loads_json(line)
+                    if isinstance(record, dict):
+                        catalog_ws.append(text_row(catalog_ws, [record['prompt_hash'], record['prompt']]))
+                    else:
+                        ws.append(text_row(ws, record))
+                        added += 1
+        
+        save_workbook_atomic(wb, excel_path)
+        rows_path.unlink()
+        
+        # The queued rows are now in the workbook; carry the cached index over
+        pending = _pending_index.pop(rows_path, None)
+        cached = _workbook_index.get(Path(excel_path))
+        if pending is not None and cached is not None:
+            session_ids, prompt_hashes = cached[1]
+            _workbook_index[Path(excel_path)] = (
+                Path(excel_path).stat().st_mtime_ns,
+                (session_ids | pending[0], prompt_hashes | pending[1])
+            )
+    
+    print(f"SUCCESS: Wrote {added} queued sessions to {excel_path}")
+    return added
+
+def append_session_from_json(json_file_path, excel_path=EXCEL_PATH):
     """
     Load session data from JSON file and append to Excel
     """
     try:
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            session_data = json.load(f)
+        with open(json_file_path, 'rb') as f:
+            session_data = loads_json(f.read())
+        resolve_system_prompt(session_data, Path(json_file_path).parent)
         return append_session_to_excel(session_data, excel_path)
     except Exception as e:
         print(f"Error loading session from {json_file_path}: {e}")
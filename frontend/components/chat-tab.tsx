@@ -35,6 +35,8 @@ export function ChatTab() {
   const [currentSessionIndex, setCurrentSessionIndex] = useState<number>(0)
   const [input, setInput] = useState("")
   const [isLoading, setIsLoading] = useState(false)
+  const [streamingText, setStreamingText] = useState("")
+  const streamingIterationRef = useRef<number | null>(null)
   const [isLoadingSessions, setIsLoadingSessions] = useState(true)
   const [connectionStatus, setConnectionStatus] = useState<"connecting" | "connected" | "disconnected">("disconnected")
   const [isSidebarOpen, setIsSidebarOpen] = useState(false)
@@ -233,7 +235,21 @@ export function ChatTab() {
 
   const handleWebSocketMessage = (data: any) => {
     switch (data.type) {
+      case "chat_delta":
+        // Show the current iteration's reply as Claude generates it
+        if (data.iteration !== streamingIterationRef.current) {
+          streamingIterationRef.current = data.iteration
+          setStreamingText(data.delta)
+        } else {
+          setStreamingText(prev => prev + data.delta)
+        }
+        break
+
       case "chat_message":
+        if (data.message.role === "assistant") {
+          setStreamingText("")
+          streamingIterationRef.current = null
+        }
         const newMessage: Message = {
           id: data.message.id,
           role: data.message.role,
@@ -254,6 +270,8 @@ export function ChatTab() {
 
       case "chat_complete":
         setIsLoading(false)
+        setStreamingText("")
+        streamingIterationRef.current = null
         console.log(`Query completed in ${data.iterations} iterations`)
         if (data.files_accessed?.length > 0) {
           console.log("Files accessed:", data.files_accessed)
@@ -262,6 +280,8 @@ export function ChatTab() {
 
       case "chat_error":
         setIsLoading(false)
+        setStreamingText("")
+        streamingIterationRef.current = null
         console.error("Chat error:", data.error)
         // Add error message to chat
         const errorMessage: Message = {
@@ -565,6 +585,11 @@ export function ChatTab() {
                         </div>
                         <span className="text-base text-gray-300 ml-2 font-medium">AI is analyzing...</span>
                       </div>
+                      {streamingText && (
+                        <p className="text-base lg:text-lg leading-relaxed whitespace-pre-wrap break-words mt-4 text-gray-300">
+                          {streamingText}
+                        </p>
+                      )}
                     </div>
                   </div>
                 )}
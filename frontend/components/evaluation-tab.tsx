@@ -101,10 +101,11 @@ export function EvaluationTab() {
   const handleWebSocketMessage = (data: any) => {
     switch (data.type) {
       case "migration_progress":
+        // Each message carries only the log entries added since the previous one
         setMigrationStatus(prev => ({
           ...prev,
           progress: data.progress,
-          logs: data.logs
+          logs: [...prev.logs, ...data.logs]
         }))
         break
 
@@ -113,7 +114,7 @@ export function EvaluationTab() {
           ...prev,
           isRunning: false,
           completed: data.completed,
-          logs: data.logs
+          logs: [...prev.logs, ...data.logs]
         }))
         if (data.completed) {
           setLastMigration(new Date())
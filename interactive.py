@@ -7,14 +7,201 @@ Conversational interface for querying files with Claude AI
 import os
 import sys
 import json
-import subprocess
+import asyncio
+import argparse
 import tempfile
+import time
+import hashlib
+from collections import OrderedDict, deque
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
 import anthropic
+from answer_cache import AnswerCache, files_fingerprint
 import re
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CLAUDE_MODEL = "claude-3-5-sonnet-20241022"
+
+# File types the query system can work with
+QUERYABLE_SUFFIXES = frozenset(('.pdf', '.xml', '.txt'))
+
+# File references in generated scripts. Pattern 2 skips paths containing whitespace,
+# which pattern 1 still catches inside open() calls
+OPEN_FILE_PATTERN = re.compile(r"open\s*\(\s*['\"]files_to_query[/\\\\]([^'\"]+)['\"]")
+FILE_PATH_PATTERN = re.compile(r"['\"]files_to_query[/\\\\]([^'\"\s]+)['\"]")
+
+# Directory under query_sessions holding each distinct system prompt as <hash>.txt
+PROMPT_STORE_DIR = "prompts"
+
+# Tab-separated summary line per saved session, newest last:
+# timestamp, session_id, iterations, files accessed, query preview
+SESSION_INDEX_NAME = ".index"
+
+def query_preview(user_query, width=50):
+    """Single-line, shortened form of a query for listings"""
+    preview = " ".join(user_query.split())
+    return preview[:width] + "..." if len(preview) > width else preview
+
+# Seconds a generated script may run before it is killed
+SCRIPT_TIMEOUT = 60
+
+# Interpreter that runs generated scripts with the common libraries already imported
+WORKER_SCRIPT = Path(__file__).parent / 'script_worker.py'
+
+# Bytes of stdout/stderr kept per script stream; a script printing more is stopped
+SCRIPT_OUTPUT_LIMIT = 32 * 1024
+PIPE_READ_SIZE = 64 * 1024
+
+async def read_capped(stream, buffer, limit):
+    """Read a pipe into buffer until EOF; returns False as soon as more than limit bytes have arrived"""
+    while True:
+        chunk = await stream.read(PIPE_READ_SIZE)
+        if not chunk:
+            return True
+        buffer += chunk
+        if len(buffer) > limit:
+            return False
+
+def decode_capped(buffer, limit):
+    """Decode captured script output, marking it when it was cut at the limit"""
+    text = bytes(buffer[:limit]).decode('utf-8', errors='replace')
+    if len(buffer) > limit:
+        text += "\n...[truncated]"
+    return text
+
+class RateLimitedClient:
+    """
+    Wraps AsyncAnthropic with a global cap on in-flight requests and a small TTL cache
+    Identical low-temperature requests are answered from the cache instead of calling Claude again
+    """
+    
+    def __init__(self, client, max_concurrency=8, cache_size=1024, cache_ttl=600):
+        self.client = client
+        self._sem = asyncio.Semaphore(max_concurrency)
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_ttl = cache_ttl
+    
+    def _cache_key(self, params):
+        """Cache key for a request, or None when its reply should not be cached"""
+        # Sampled responses are expected to differ between calls, so only cache near-greedy ones
+        if params.get('temperature', 1.0) > 0.2:
+            return None
+        return hashlib.blake2b(json.dumps(params, sort_keys=True).encode('utf-8')).digest()
+    
+    def _cache_get(self, key):
+        cached = self._cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            self._cache.move_to_end(key)
+            return cached[1]
+        return None
+    
+    def _cache_put(self, key, text):
+        self._cache[key] = (time.monotonic() + self._cache_ttl, text)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+    
+    async def create_text(self, **params):
+        """Call messages.create and return the reply text, reusing cached replies for deterministic requests"""
+        key = self._cache_key(params)
+        if key is not None:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+        
+        async with self._sem:
+            response = await self.client.messages.create(**params)
+        text = response.content[0].text
+        
+        if key is not None:
+            self._cache_put(key, text)
+        return text
+    
+    async def stream_text(self, **params):
+        """Stream the reply text chunk by chunk as Claude generates it (a cached reply arrives as one chunk)"""
+        key = self._cache_key(params)
+        if key is not None:
+            cached = self._cache_get(key)
+            if cached is not None:
+                yield cached
+                return
+        
+        chunks = []
+        # Leaving early (aclose() or an error) closes the HTTP stream and frees the slot
+        async with self._sem:
+            async with await self.client.messages.create(stream=True, **params) as stream:
+                async for event in stream:
+                    if event.type == 'content_block_delta' and event.delta.type == 'text_delta':
+                        chunks.append(event.delta.text)
+                        yield event.delta.text
+        
+        if key is not None:
+            self._cache_put(key, ''.join(chunks))
+    
+    async def close(self):
+        await self.client.close()
+
+class ScriptWorkerPool:
+    """
+    Keeps a few script_worker interpreters started ahead of time, libraries already imported
+    Each worker runs a single script and is replaced in the background, so every script still
+    gets a fresh interpreter without waiting for one to start
+    """
+    
+    def __init__(self, cwd, size=2):
+        self.cwd = cwd
+        self.size = size
+        self._idle = deque()
+        self._starting = set()
+    
+    async def _spawn(self):
+        return await asyncio.create_subprocess_exec(
+            sys.executable, str(WORKER_SCRIPT),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=self.cwd
+        )
+    
+    async def _start_idle(self):
+        try:
+            self._idle.append(await self._spawn())
+        except Exception as e:
+            print(f"Could not start script worker: {e}")
+    
+    def fill(self):
+        """Start workers in the background until the pool is full"""
+        while len(self._idle) + len(self._starting) < self.size:
+            task = asyncio.ensure_future(self._start_idle())
+            self._starting.add(task)
+            task.add_done_callback(self._starting.discard)
+    
+    async def acquire(self):
+        """Take a warm worker, starting one now if none is idle, and top the pool back up"""
+        process = None
+        while self._idle and process is None:
+            candidate = self._idle.popleft()
+            if candidate.returncode is None:
+                process = candidate
+        if process is None:
+            process = await self._spawn()
+        self.fill()
+        return process
+    
+    async def close(self):
+        await asyncio.gather(*self._starting, return_exceptions=True)
+        while self._idle:
+            process = self._idle.popleft()
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
 class InteractiveAIFileQuerySystem:
     def __init__(self):
         # Load environment variables
@@ -24,9 +211,25 @@ class InteractiveAIFileQuerySystem:
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in .env file")
         
-        self.client = anthropic.Anthropic(api_key=self.api_key)
+        # Retries for rate-limited/overloaded calls; the SDK backs off exponentially with jitter and honours Retry-After
+        max_retries = int(os.getenv('CLAUDE_MAX_RETRIES', 4))
+        
+        self.client = RateLimitedClient(
+            anthropic.AsyncAnthropic(api_key=self.api_key, max_retries=max_retries),
+            max_concurrency=int(os.getenv('CLAUDE_MAX_CONCURRENCY', 8))
+        )
         self.max_iterations = int(os.getenv('MAX_ITERATIONS', 10))
         
+        # Generated scripts are piped to the worker; set DEBUG_SCRIPTS=1 to also keep them in temp_scripts/
+        self.debug_scripts = os.getenv('DEBUG_SCRIPTS', '').lower() in ('1', 'true', 'yes')
+        
+        # Warm interpreters for generated scripts
+        self.script_pool = ScriptWorkerPool(Path(__file__).parent, size=int(os.getenv('SCRIPT_WORKERS', 2)))
+        
+        # Optional sampling temperature; when unset the API default is used
+        temperature = os.getenv('CLAUDE_TEMPERATURE')
+        self.temperature = float(temperature) if temperature else None
+        
         # Set up paths
         self.base_dir = Path(__file__).parent
         self.files_dir = self.base_dir / os.getenv('FILES_TO_QUERY_DIR', 'files_to_query')
@@ -37,14 +240,23 @@ class InteractiveAIFileQuerySystem:
         # Create sessions directory if it doesn't exist
         self.sessions_dir.mkdir(exist_ok=True)
         
+        # Answers to repeated queries over unchanged files; ANSWER_CACHE_TTL=0 turns it off
+        cache_ttl = int(os.getenv('ANSWER_CACHE_TTL', 86400))
+        self.answer_cache = AnswerCache(self.sessions_dir / 'answer_cache.sqlite3', cache_ttl) if cache_ttl > 0 else None
+        
         # Load system prompt
         self.system_prompt = self.load_system_prompt()
         
+        # (files_dir mtime_ns, file list) from the last directory scan
+        self._files_cache = None
+        
+        # Prompt hashes already written to the prompt store by this process
+        self._stored_prompts = set()
+        
     def load_system_prompt(self):
         """Load the system prompt from file"""
         try:
-            with open(self.system_prompt_file, 'r', encoding='utf-8') as f:
-                return f.read().strip()
+            return self.system_prompt_file.read_text(encoding='utf-8').strip()
         except FileNotFoundError:
             return """You are an AI assistant specialized in analyzing and querying files. Your task is to help users find information from uploaded documents (PDF, XML, TXT files) by writing and executing Python scripts.
 
@@ -64,47 +276,84 @@ When you find a satisfactory answer, respond with 'QUERY_COMPLETE:' followed by
 5. Only continue iterating if you need to refine or get better results"""
     
     def get_available_files(self):
-        """Get list of available files to query"""
+        """
+        Get list of available files to query
+        The scan is reused until files are added, removed or renamed in files_dir
+        """
+        try:
+            mtime = self.files_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            return []
+        if self._files_cache and self._files_cache[0] == mtime:
+            return list(self._files_cache[1])
+        
+        # scandir reports the entry type with the name, so no extra stat per file
+        prefix = self.files_dir.relative_to(self.base_dir)
         files = []
-        for file_path in self.files_dir.glob('*'):
-            if file_path.is_file() and file_path.suffix.lower() in ['.pdf', '.xml', '.txt']:
-                files.append(str(file_path.relative_to(self.base_dir)))
-        return files
+        with os.scandir(self.files_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in QUERYABLE_SUFFIXES:
+                    files.append(str(prefix / entry.name))
+        self._files_cache = (mtime, files)
+        return list(files)
     
-    def execute_python_script(self, script_content, script_name):
-        """Execute a Python script and return the output"""
+    async def execute_python_script(self, script_content, script_name):
+        """Execute a Python script in a subprocess and return the output"""
         script_path = self.scripts_dir / f"{script_name}.py"
         
         try:
-            # Write script to file
-            with open(script_path, 'w', encoding='utf-8') as f:
-                f.write(script_content)
+            # Keep a copy on disk only when debugging
+            if self.debug_scripts:
+                with open(script_path, 'w', encoding='utf-8') as f:
+                    f.write(script_content)
             
-            # Execute script
-            result = subprocess.run(
-                [sys.executable, str(script_path)],
-                capture_output=True,
-                text=True,
-                cwd=self.base_dir,
-                timeout=60  # Increased timeout
-            )
+            # Execute script in a warm worker without blocking the event loop - the source goes
+            # through its stdin after the path it should run under
+            process = await self.script_pool.acquire()
+            process.stdin.write(f"{script_path}\n".encode('utf-8') + script_content.encode('utf-8'))
+            await process.stdin.drain()
+            process.stdin.close()
             
-            return {
-                'success': result.returncode == 0,
-                'output': result.stdout,
-                'error': result.stderr,
-                'script_path': str(script_path),
-                'script_content': script_content
-            }
+            # Read the pipes as the script writes them, stopping it once either passes the limit
+            stdout, stderr = bytearray(), bytearray()
+            overflowed = []
+            
+            async def collect(stream, buffer):
+                if not await read_capped(stream, buffer, SCRIPT_OUTPUT_LIMIT):
+                    overflowed.append(stream)
+                    if process.returncode is None:
+                        process.kill()
+            
+            error = None
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(collect(process.stdout, stdout), collect(process.stderr, stderr), process.wait()),
+                    timeout=SCRIPT_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                error = f'Script execution timed out ({SCRIPT_TIMEOUT} seconds)'
+            finally:
+                # Timed out or cancelled - don't leave the script running
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+            
+            if overflowed:
+                error = f'Script output exceeded {SCRIPT_OUTPUT_LIMIT // 1024} KB and the script was stopped - print less'
+            
+            # Whatever the script printed before a timeout or overflow is still reported
+            stderr_text = decode_capped(stderr, SCRIPT_OUTPUT_LIMIT)
+            if error and stderr_text:
+                error = f"{error}\n{stderr_text}"
             
-        except subprocess.TimeoutExpired:
             return {
-                'success': False,
-                'output': '',
-                'error': 'Script execution timed out (60 seconds)',
+                'success': error is None and process.returncode == 0,
+                'output': decode_capped(stdout, SCRIPT_OUTPUT_LIMIT),
+                'error': error or stderr_text,
                 'script_path': str(script_path),
                 'script_content': script_content
             }
+            
         except Exception as e:
             return {
                 'success': False,
@@ -116,49 +365,61 @@ When you find a satisfactory answer, respond with 'QUERY_COMPLETE:' followed by
     
     def extract_files_accessed(self, script_content):
         """Extract which files the script is trying to access"""
-        files_accessed = []
+        # Every pattern below needs the directory name, so most unrelated scripts stop here
+        if 'files_to_query' not in script_content:
+            return []
         
-        try:
-            # Pattern 1: open('files_to_query/filename.ext') or open("files_to_query/filename.ext")
-            pattern1 = r"open\s*\(\s*['\"]files_to_query[/\\\\]([^'\"]+)['\"]"
-            matches1 = re.findall(pattern1, script_content)
-            files_accessed.extend([f"files_to_query/{match}" for match in matches1])
-            
-            # Pattern 2: Any string containing 'files_to_query/filename.ext'
-            pattern2 = r"['\"]files_to_query[/\\\\]([^'\"\s]+)['\"]"
-            matches2 = re.findall(pattern2, script_content)
-            files_accessed.extend([f"files_to_query/{match}" for match in matches2])
-            
-        except re.error as e:
-            # If regex fails, fall back to simple string detection
-            print(f"Regex error in file detection: {e}")
-            lines = script_content.split('\n')
-            for line in lines:
-                if 'files_to_query/' in line:
-                    # Simple extraction for common cases
-                    if '.txt' in line or '.pdf' in line or '.xml' in line:
-                        files_accessed.append("files_to_query/ (detected but pattern failed)")
-                        break
+        # Pattern 1: open('files_to_query/filename.ext') or open("files_to_query/filename.ext")
+        files_accessed = [f"files_to_query/{match}" for match in OPEN_FILE_PATTERN.findall(script_content)]
+        
+        # Pattern 2: Any string containing 'files_to_query/filename.ext'
+        files_accessed.extend(f"files_to_query/{match}" for match in FILE_PATH_PATTERN.findall(script_content))
         
         # Pattern 3: files_dir.glob or similar directory operations
-        if 'files_to_query' in script_content.lower():
-            # If script mentions the directory but not specific files, 
-            # it might be doing directory scanning
-            if not files_accessed:
-                files_accessed.append("files_to_query/ (directory scan)")
+        # If script mentions the directory but not specific files, 
+        # it might be doing directory scanning
+        if not files_accessed:
+            files_accessed.append("files_to_query/ (directory scan)")
         
         # Remove duplicates while preserving order
-        seen = set()
-        unique_files = []
-        for file in files_accessed:
-            if file not in seen:
-                seen.add(file)
-                unique_files.append(file)
+        return list(dict.fromkeys(files_accessed))
+    
+    def journal_path(self, session_id):
+        """Path of the in-progress journal for a query session"""
+        return self.sessions_dir / f"session_{session_id}.jsonl"
+    
+    def append_journal(self, session_id, record_type, record):
+        """
+        Append one record to the session journal as a JSON line
+        The journal grows by one line per iteration, so a crashed query can still be recovered from it
+        """
+        line = json.dumps({'type': record_type, **record}, ensure_ascii=False, separators=(',', ':'))
+        with open(self.journal_path(session_id), 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+    
+    def store_system_prompt(self):
+        """
+        Write the current system prompt to query_sessions/prompts/<hash>.txt, once per distinct prompt
+        Returns the hash session files refer to it by
+        """
+        prompt_bytes = self.system_prompt.encode('utf-8', 'ignore')
+        prompt_hash = hashlib.blake2b(prompt_bytes, digest_size=8).hexdigest()
+        if prompt_hash in self._stored_prompts:
+            return prompt_hash
         
-        return unique_files
+        prompt_path = self.sessions_dir / PROMPT_STORE_DIR / f"{prompt_hash}.txt"
+        if not prompt_path.exists():
+            prompt_path.parent.mkdir(exist_ok=True)
+            # Written beside the final name and swapped in, so readers never see half a prompt
+            fd, tmp_path = tempfile.mkstemp(dir=prompt_path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(prompt_bytes)
+            os.replace(tmp_path, prompt_path)
+        self._stored_prompts.add(prompt_hash)
+        return prompt_hash
     
     def save_session(self, user_query, iterations, final_answer, session_id, files_accessed=None):
-        """Save the query session to a file"""
+        """Save the query session to a file, replacing its in-progress journal"""
         session_data = {
             'session_id': session_id,
             'timestamp': datetime.now().isoformat(),
@@ -168,34 +429,37 @@ When you find a satisfactory answer, respond with 'QUERY_COMPLETE:' followed by
             'max_iterations_allowed': self.max_iterations,
             'files_accessed': files_accessed or [],
             'available_files': self.get_available_files(),
-            'system_prompt': self.system_prompt,  # Store the actual system prompt used
+            'system_prompt_hash': self.store_system_prompt(),  # Full text in prompts/<hash>.txt
             'iterations': iterations
         }
         
         session_file = self.sessions_dir / f"session_{session_id}.json"
         with open(session_file, 'w', encoding='utf-8') as f:
-            json.dump(session_data, f, indent=2, ensure_ascii=False)
-        
-        return session_file
-    
-    def query_files(self, user_query, session_id):
-        """Main method to process user query using Claude"""
-        available_files = self.get_available_files()
+            json.dump(session_data, f, ensure_ascii=False, separators=(',', ':'))
         
-        if not available_files:
-            return "No files found in the files_to_query directory. Please add PDF, XML, or TXT files to query.", []
+        # One line per session for the recent-sessions listing
+        with open(self.sessions_dir / SESSION_INDEX_NAME, 'a', encoding='utf-8') as f:
+            f.write(f"{session_data['timestamp']}\t{session_id}\t{len(iterations)}\t"
+                    f"{len(session_data['files_accessed'])}\t{query_preview(user_query)}\n")
         
-        conversation_history = []
-        iterations = []
-        all_files_accessed = set()  # Track all files accessed across iterations
+        # The session file now holds everything the journal recorded
+        try:
+            self.journal_path(session_id).unlink()
+        except FileNotFoundError:
+            pass
         
-        # Initial message with context
-        initial_message = f"""
-User Query: {user_query}
-
+        return session_file
+    
+    def build_initial_message(self, user_query, available_files):
+        """
+        Build the first user turn of a query conversation as content blocks
+        The instructions and file list repeat across iterations and queries, so they form a
+        block marked for prompt caching; the user query follows in a block of its own
+        """
+        instructions = f"""
 Available files to query: {', '.join(available_files)}
 
-Please write a Python script to help answer this query. The script should:
+Please write a Python script to help answer the query below. The script should:
 1. Read and analyze the relevant files from the files_to_query directory
 2. Extract the information needed to answer the user's question
 3. Print the results clearly
@@ -203,81 +467,72 @@ Please write a Python script to help answer this query. The script should:
 When you have a complete answer, start your response with 'QUERY_COMPLETE:' followed by the final answer.
 You have up to {self.max_iterations} iterations if needed, but you can stop early when satisfied.
 """
+        return [
+            {"type": "text", "text": instructions, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": f"User Query: {user_query}\n"}
+        ]
+    
+    def start_iteration(self, claude_response, iteration):
+        """Create the iteration record for a Claude response and extract its Python script, if any"""
+        # Check if Claude indicates completion
+        is_complete = "QUERY_COMPLETE:" in claude_response
         
-        conversation_history.append({"role": "user", "content": initial_message})
+        # CRITICAL FIX: If Claude wrote a script AND used QUERY_COMPLETE in the same response,
+        # this is invalid - Claude cannot complete without seeing script results first
+        if "```python" in claude_response and is_complete:
+            print(f"  Claude attempted to complete before seeing script results - continuing to next iteration")
+            is_complete = False  # Override the completion flag
         
-        for iteration in range(self.max_iterations):
-            print(f"\\n Iteration {iteration + 1}/{self.max_iterations}")
+        iteration_data = {
+            'iteration_number': iteration + 1,
+            'claude_response': claude_response,
+            'script_executed': False,
+            'execution_result': None,
+            'is_complete': is_complete,
+            'files_accessed_this_iteration': []
+        }
+        
+        # Extract Python code from response
+        script_content = None
+        if "```python" in claude_response:
+            code_start = claude_response.find("```python") + 9
+            code_end = claude_response.find("```", code_start)
+            script_content = claude_response[code_start:code_end].strip()
             
-            try:
-                # Call Claude API
-                response = self.client.messages.create(
-                    model="claude-3-5-sonnet-20241022",
-                    max_tokens=4000,
-                    system=self.system_prompt,
-                    messages=conversation_history
-                )
-                
-                claude_response = response.content[0].text
-                print(f"Claude is working...")
-                
-                # Check if Claude indicates completion
-                is_complete = "QUERY_COMPLETE:" in claude_response
-                
-                # CRITICAL FIX: If Claude wrote a script AND used QUERY_COMPLETE in the same response,
-                # this is invalid - Claude cannot complete without seeing script results first
-                if "```python" in claude_response and is_complete:
-                    print(f"  Claude attempted to complete before seeing script results - continuing to next iteration")
-                    is_complete = False  # Override the completion flag
-                
-                iteration_data = {
-                    'iteration_number': iteration + 1,
-                    'claude_response': claude_response,
-                    'script_executed': False,
-                    'execution_result': None,
-                    'is_complete': is_complete,
-                    'files_accessed_this_iteration': []
-                }
+            # Extract files accessed by this script
+            iteration_data['files_accessed_this_iteration'] = self.extract_files_accessed(script_content)
+        
+        return iteration_data, script_content
+    
+    def finish_iteration(self, claude_response, iteration_data, execution_result, user_query, conversation_history):
+        """
+        Record the script result for an iteration and queue the next user turn
+        Returns the final answer once Claude has completed the query, otherwise None
+        """
+        is_complete = iteration_data['is_complete']
+        
+        if execution_result is not None:
+            iteration_data['script_executed'] = True
+            iteration_data['execution_result'] = execution_result
+            
+            if execution_result['success']:
+                print(f" Script executed successfully")
+                if execution_result['output']:
+                    print(f" Output preview: {execution_result['output'][:200]}...")
+            else:
+                print(f" Script failed: {execution_result['error'][:100]}...")
+            
+            # Add to conversation history
+            conversation_history.append({"role": "assistant", "content": claude_response})
+            
+            if execution_result['success'] and execution_result['output']:
+                if is_complete:
+                    # This should rarely happen now due to our fix above, but just in case
+                    final_answer_start = claude_response.find("QUERY_COMPLETE:") + 15
+                    return claude_response[final_answer_start:].strip()
                 
-                # Extract Python code from response
-                if "```python" in claude_response:
-                    code_start = claude_response.find("```python") + 9
-                    code_end = claude_response.find("```", code_start)
-                    script_content = claude_response[code_start:code_end].strip()
-                    
-                    # Extract files accessed by this script
-                    files_this_iteration = self.extract_files_accessed(script_content)
-                    iteration_data['files_accessed_this_iteration'] = files_this_iteration
-                    all_files_accessed.update(files_this_iteration)
-                    
-                    # Execute the script
-                    script_name = f"query_{session_id}_iteration_{iteration + 1}"
-                    execution_result = self.execute_python_script(script_content, script_name)
-                    
-                    iteration_data['script_executed'] = True
-                    iteration_data['execution_result'] = execution_result
-                    
-                    if execution_result['success']:
-                        print(f" Script executed successfully")
-                        if execution_result['output']:
-                            print(f" Output preview: {execution_result['output'][:200]}...")
-                    else:
-                        print(f" Script failed: {execution_result['error'][:100]}...")
-                    
-                    # Add to conversation history
-                    conversation_history.append({"role": "assistant", "content": claude_response})
-                    
-                    if execution_result['success'] and execution_result['output']:
-                        if is_complete:
-                            # This should rarely happen now due to our fix above, but just in case
-                            final_answer_start = claude_response.find("QUERY_COMPLETE:") + 15
-                            final_answer = claude_response[final_answer_start:].strip()
-                            
-                            iterations.append(iteration_data)
-                            return final_answer, iterations, list(all_files_accessed)
-                        else:
-                            # This is the correct flow: ask Claude to interpret results in next iteration
-                            interpretation_request = f"""
+                # This is the correct flow: ask Claude to interpret results in next iteration
+                interpretation_request = f"""
 The script executed successfully with the following output:
 {execution_result['output']}
 
@@ -287,50 +542,187 @@ IMPORTANT: Trust the script results completely. If the script says "14", report
 
 If you now have a complete answer based on these script results, start your response with 'QUERY_COMPLETE:' followed by your analysis.
 """
-                            conversation_history.append({"role": "user", "content": interpretation_request})
-                    
-                    else:
-                        # Script failed, ask Claude to fix it  
-                        error_message = f"""
+                conversation_history.append({"role": "user", "content": interpretation_request})
+            
+            else:
+                # Script failed, ask Claude to fix it  
+                error_message = f"""
 The script encountered an error:
 Error: {execution_result['error']}
 Output: {execution_result['output']}
 
 Please write an improved script to solve the issue. Do NOT use 'QUERY_COMPLETE:' until you have seen successful script results.
 """
-                        conversation_history.append({"role": "user", "content": error_message})
+                conversation_history.append({"role": "user", "content": error_message})
+        
+        else:
+            # No code found, check if it's a final answer
+            if is_complete:
+                final_answer_start = claude_response.find("QUERY_COMPLETE:") + 15
+                return claude_response[final_answer_start:].strip()
+            
+            # Ask for clarification but prevent premature completion
+            conversation_history.append({"role": "assistant", "content": claude_response})
+            conversation_history.append({
+                "role": "user", 
+                "content": "Please provide a Python script to analyze the files and answer the query. Do NOT use 'QUERY_COMPLETE:' until you have executed a script and seen the results."
+            })
+        
+        return None
+    
+    @property
+    def system_prompt(self):
+        return self._system_prompt
+    
+    @system_prompt.setter
+    def system_prompt(self, prompt):
+        """Swap the system prompt and rebuild the request parameters that embed it"""
+        self._system_prompt = prompt
+        
+        # Everything except the conversation is fixed between calls, so build it once here.
+        # The system prompt is marked for prompt caching so iterations after the first reuse it
+        self._base_params = {
+            'model': CLAUDE_MODEL,
+            'max_tokens': 4000,
+            'system': [{"type": "text", "text": prompt, "cache_control": {"type": "ephemeral"}}]
+        }
+        if self.temperature is not None:
+            self._base_params['temperature'] = self.temperature
+    
+    def message_params(self, messages):
+        """Build the messages.create arguments for a conversation"""
+        return {**self._base_params, 'messages': messages}
+    
+    async def create_message(self, conversation_history, prediction=None, on_delta=None):
+        """
+        Ask Claude for the next assistant turn through the rate-limited client and return its text
+        When a prediction is given, the reply is prefilled with it so Claude only generates the rest
+        When on_delta is given, the reply is streamed and each text chunk is awaited through it as it arrives
+        """
+        if prediction:
+            prediction = prediction.rstrip()  # The API rejects prefills that end in whitespace
+            try:
+                rest = await self._request_text(
+                    self.message_params(conversation_history + [{"role": "assistant", "content": prediction}]),
+                    on_delta, prefix=prediction
+                )
+                return prediction + rest
+            except anthropic.BadRequestError:
+                pass  # Prefill not accepted - fall back to a plain request
+        
+        return await self._request_text(self.message_params(conversation_history), on_delta)
+    
+    async def _request_text(self, params, on_delta, prefix=None):
+        """Fetch reply text, streaming it through on_delta when a callback is given"""
+        if on_delta is None:
+            return await self.client.create_text(**params)
+        
+        chunks = []
+        stream = self.client.stream_text(**params)
+        try:
+            async for delta in stream:
+                if prefix:
+                    # Only surface the prefill once the request has been accepted
+                    await on_delta(prefix)
+                    prefix = None
+                chunks.append(delta)
+                await on_delta(delta)
+        finally:
+            # Close it right away if on_delta failed (e.g. the client disconnected) rather than on garbage collection
+            await stream.aclose()
+        return ''.join(chunks)
+    
+    async def query_files(self, user_query, session_id, prediction=None, on_delta=None):
+        """
+        Main method to process user query using Claude
+        Claude calls and script runs are awaited, so concurrent queries share one event loop
+        prediction optionally supplies the expected opening of Claude's first reply (e.g. a
+        templated answer skeleton), which is prefilled so it doesn't have to be generated
+        on_delta(text, iteration_number) is awaited for every chunk of Claude's replies as they stream in
+        """
+        available_files = self.get_available_files()
+        
+        if not available_files:
+            return "No files found in the files_to_query directory. Please add PDF, XML, or TXT files to query.", []
+        
+        conversation_history = [{"role": "user", "content": self.build_initial_message(user_query, available_files)}]
+        iterations = []
+        all_files_accessed = set()  # Track all files accessed across iterations
+        
+        # The same question about the same files was answered before - skip Claude entirely
+        fingerprint = None
+        if self.answer_cache is not None:
+            fingerprint = files_fingerprint([str(self.base_dir / f) for f in available_files], self.system_prompt)
+            cached = self.answer_cache.get(str(self.files_dir), user_query, fingerprint)
+            if cached is not None:
+                print("Answer served from cache")
+                return cached[0], iterations, cached[1]
+        
+        # Workers start while Claude writes the first script
+        self.script_pool.fill()
+        
+        self.append_journal(session_id, 'start', {
+            'session_id': session_id,
+            'timestamp': datetime.now().isoformat(),
+            'user_query': user_query
+        })
+        
+        for iteration in range(self.max_iterations):
+            print(f"\\n Iteration {iteration + 1}/{self.max_iterations}")
+            
+            try:
+                # Call Claude API without blocking the event loop
+                iteration_delta = None
+                if on_delta is not None:
+                    async def iteration_delta(text, number=iteration + 1):
+                        await on_delta(text, number)
+                
+                claude_response = await self.create_message(
+                    conversation_history, prediction if iteration == 0 else None, iteration_delta
+                )
+                print(f"Claude is working...")
                 
-                else:
-                    # No code found, check if it's a final answer
-                    if is_complete:
-                        final_answer_start = claude_response.find("QUERY_COMPLETE:") + 15
-                        final_answer = claude_response[final_answer_start:].strip()
-                        
-                        iterations.append(iteration_data)
-                        return final_answer, iterations, list(all_files_accessed)
-                    else:
-                        # Ask for clarification but prevent premature completion
-                        conversation_history.append({"role": "assistant", "content": claude_response})
-                        conversation_history.append({
-                            "role": "user", 
-                            "content": "Please provide a Python script to analyze the files and answer the query. Do NOT use 'QUERY_COMPLETE:' until you have executed a script and seen the results."
-                        })
+                iteration_data, script_content = self.start_iteration(claude_response, iteration)
                 
+                execution_result = None
+                if script_content is not None:
+                    all_files_accessed.update(iteration_data['files_accessed_this_iteration'])
+                    script_name = f"query_{session_id}_iteration_{iteration + 1}"
+                    execution_result = await self.execute_python_script(script_content, script_name)
+                
+                final_answer = self.finish_iteration(claude_response, iteration_data, execution_result, user_query, conversation_history)
                 iterations.append(iteration_data)
+                self.append_journal(session_id, 'iteration', iteration_data)
+                
+                if final_answer is not None:
+                    if fingerprint is not None:
+                        self.answer_cache.put(str(self.files_dir), user_query, fingerprint, final_answer, list(all_files_accessed))
+                    return final_answer, iterations, list(all_files_accessed)
             
             except Exception as e:
-                error_iteration = {
-                    'iteration_number': iteration + 1,
-                    'error': str(e),
-                    'script_executed': False,
-                    'execution_result': None,
-                    'is_complete': False,
-                    'files_accessed_this_iteration': []
-                }
-                iterations.append(error_iteration)
+                iterations.append(self.error_iteration(iteration, e))
+                self.append_journal(session_id, 'iteration', iterations[-1])
                 return f"Error during iteration {iteration + 1}: {str(e)}", iterations, list(all_files_accessed)
         
         return f"Unable to complete the query after {self.max_iterations} iterations. Please try a more specific query or check your files.", iterations, list(all_files_accessed)
+    
+    async def close(self):
+        """Release the Claude client, any idle script workers and the answer cache"""
+        await self.client.close()
+        await self.script_pool.close()
+        if self.answer_cache is not None:
+            self.answer_cache.close()
+    
+    def error_iteration(self, iteration, error):
+        """Build the iteration record for a failed Claude call"""
+        return {
+            'iteration_number': iteration + 1,
+            'error': str(error),
+            'script_executed': False,
+            'execution_result': None,
+            'is_complete': False,
+            'files_accessed_this_iteration': []
+        }
 
 def display_welcome():
     """Display welcome message"""
@@ -355,39 +747,128 @@ def show_files(system):
         print("\\n No files found in files_to_query/ directory")
         print("   Add PDF, XML, or TXT files to start querying")
 
+def recent_sessions_from_json(sessions_dir, limit):
+    """Summaries of the newest session files, read from the files themselves (no index yet)"""
+    # Session IDs start with a YYYYMMDD_HHMMSS timestamp, so name order is time order - no stat per file
+    session_files = sorted(sessions_dir.glob("session_*.json"), key=lambda x: x.name, reverse=True)
+    
+    sessions = []
+    for session_file in session_files[:limit]:
+        try:
+            raw = session_file.read_bytes()
+            session_data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+            sessions.append((
+                session_data['timestamp'],
+                session_data['total_iterations'],
+                len(session_data.get('files_accessed') or []),
+                query_preview(session_data['user_query'])
+            ))
+        except Exception:
+            continue
+    return sessions
+
+def recent_sessions_from_index(index_file, limit):
+    """Summaries of the newest sessions from the session index, newest first"""
+    sessions = []
+    for line in reversed(index_file.read_text(encoding='utf-8').splitlines()[-limit:]):
+        try:
+            timestamp, _, iterations, files_count, preview = line.split('\t', 4)
+            sessions.append((timestamp, int(iterations), int(files_count), preview))
+        except ValueError:
+            continue
+    return sessions
+
 def show_recent_sessions(sessions_dir, limit=5):
     """Show recent query sessions"""
-    session_files = list(sessions_dir.glob("session_*.json"))
-    session_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+    index_file = sessions_dir / SESSION_INDEX_NAME
+    if index_file.exists():
+        sessions = recent_sessions_from_index(index_file, limit)
+    else:
+        sessions = recent_sessions_from_json(sessions_dir, limit)
     
-    if not session_files:
+    if not sessions:
         print("\\n No previous sessions found")
         return
     
     print(f"\\n Recent sessions (showing last {limit}):")
-    for i, session_file in enumerate(session_files[:limit], 1):
+    for i, (timestamp, iterations, files_count, preview) in enumerate(sessions, 1):
         try:
-            with open(session_file, 'r', encoding='utf-8') as f:
-                session_data = json.load(f)
-            
-            timestamp = datetime.fromisoformat(session_data['timestamp']).strftime("%Y-%m-%d %H:%M")
-            query_preview = session_data['user_query'][:50] + "..." if len(session_data['user_query']) > 50 else session_data['user_query']
-            iterations = session_data['total_iterations']
-            
-            # Show files accessed if available
-            files_info = ""
-            if 'files_accessed' in session_data and session_data['files_accessed']:
-                files_count = len(session_data['files_accessed'])
-                files_info = f" | {files_count} files"
-            
-            print(f"  {i}. {timestamp} | {iterations} iterations{files_info} | {query_preview}")
-        except Exception:
+            timestamp = datetime.fromisoformat(timestamp).strftime("%Y-%m-%d %H:%M")
+        except ValueError:
             continue
+        
+        # Show files accessed if available
+        files_info = f" | {files_count} files" if files_count else ""
+        
+        print(f"  {i}. {timestamp} | {iterations} iterations{files_info} | {preview}")
+
+async def run_query(system, user_query, session_id):
+    """Run one query and save its session file off the event loop"""
+    result, iterations, files_accessed = await system.query_files(user_query, session_id)
+    
+    # Save session with files accessed info
+    session_file = await asyncio.to_thread(system.save_session, user_query, iterations, result, session_id, files_accessed)
+    return result, iterations, files_accessed, session_file
+
+def show_result(system, result, iterations, files_accessed, session_file):
+    """Display the outcome of a query"""
+    print("\\n" + "=" * 60)
+    print(" FINAL RESULT")
+    print("=" * 60)
+    print(result)
+    print("\\n" + "=" * 60)
+    print(f" Session saved: {session_file.name}")
+    print(f"Iterations used: {len(iterations)}/{system.max_iterations}")
+    if files_accessed:
+        print(f" Files accessed: {', '.join(files_accessed)}")
+
+async def run_concurrent(system, queries):
+    """Run several queries at once on one event loop and show each result"""
+    prefix = datetime.now().strftime('%Y%m%d_%H%M%S')
+    outcomes = await asyncio.gather(
+        *(run_query(system, query, f"{prefix}_{i:03d}") for i, query in enumerate(queries, 1)),
+        return_exceptions=True
+    )
+    
+    for query, outcome in zip(queries, outcomes):
+        print(f"\\n Query: {query}")
+        if isinstance(outcome, Exception):
+            print(f" Error processing query: {str(outcome)}")
+        else:
+            show_result(system, *outcome)
+
+def run_on_loop(loop, coro):
+    """Run a coroutine on the CLI event loop, cancelling it if the user interrupts"""
+    task = loop.create_task(coro)
+    try:
+        return loop.run_until_complete(task)
+    except KeyboardInterrupt:
+        task.cancel()
+        loop.run_until_complete(asyncio.gather(task, return_exceptions=True))
+        raise
 
 def main():
     """Main interactive function"""
+    parser = argparse.ArgumentParser(description="Query files in files_to_query with Claude")
+    parser.add_argument('--concurrent', nargs='+', metavar='QUERY',
+                       help='Run the given queries concurrently and exit')
+    parser.add_argument('--debug-scripts', action='store_true',
+                       help='Keep generated scripts in the temp scripts directory')
+    args = parser.parse_args()
+    
+    # One event loop for the whole run - the async client's connections belong to it
+    loop = asyncio.new_event_loop()
+    system = None
+    
     try:
         system = InteractiveAIFileQuerySystem()
+        if args.debug_scripts:
+            system.debug_scripts = True
+        
+        if args.concurrent:
+            run_on_loop(loop, run_concurrent(system, args.concurrent))
+            return 0
+        
         display_welcome()
         
         # Show available files initially
@@ -424,21 +905,8 @@ def main():
             print(f"\\n Processing query (Session: {session_id})...")
             
             try:
-                result, iterations, files_accessed = system.query_files(user_input, session_id)
-                
-                # Save session with files accessed info
-                session_file = system.save_session(user_input, iterations, result, session_id, files_accessed)
-                
                 # Display results
-                print("\\n" + "=" * 60)
-                print(" FINAL RESULT")
-                print("=" * 60)
-                print(result)
-                print("\\n" + "=" * 60)
-                print(f" Session saved: {session_file.name}")
-                print(f"Iterations used: {len(iterations)}/{system.max_iterations}")
-                if files_accessed:
-                    print(f" Files accessed: {', '.join(files_accessed)}")
+                show_result(system, *run_on_loop(loop, run_query(system, user_input, session_id)))
                 
                 session_counter += 1
                 
@@ -455,6 +923,10 @@ def main():
         print("1. Your API key is set in .env file")
         print("2. Dependencies are installed: pip install -r requirements.txt")
         return 1
+    finally:
+        if system is not None:
+            loop.run_until_complete(system.close())
+        loop.close()
     
     return 0
 
@@ -4,139 +4,82 @@ Migrate existing session data from JSON files to Excel tracking spreadsheet
 Avoids duplicates and handles various data formats
 """
 
-import json
+import asyncio
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from openpyxl import load_workbook
 from datetime import datetime
-import hashlib
+from excel_integration import (
+    EXCEL_PATH, catalog_row, clean_text_for_excel, extract_script_content_for_excel,
+    loads_json, open_tracking_workbook, prompt_column_value, prompt_hash,
+    rebuild_xlsx_from_jsonl, resolve_system_prompt, save_workbook_atomic, text_row
+)
 
-def get_system_prompt_hash(system_prompt):
-    """Create a short hash of the system prompt for tracking"""
-    if not system_prompt:
-        return "N/A"
-    # Create hash and add first few words for identification
-    hash_val = hashlib.md5(system_prompt.encode()).hexdigest()[:8]
-    # Get first meaningful words (skip common starting words)
-    words = system_prompt.split()
-    meaningful_words = []
-    skip_words = {'you', 'are', 'an', 'ai', 'assistant', 'the', 'a', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
-    
-    for word in words[:20]:  # Check first 20 words
-        clean_word = word.lower().strip('.,!?;:"')
-        if len(clean_word) > 3 and clean_word not in skip_words:
-            meaningful_words.append(clean_word)
-        if len(meaningful_words) >= 3:
-            break
-    
-    if meaningful_words:
-        return f"{hash_val} ({', '.join(meaningful_words)})"
-    else:
-        return f"{hash_val} (prompt)"
+# Threads reading session files at once - reads mostly wait on the disk, so this
+# can exceed the CPU count (and the default executor) on slow or network storage
+SESSION_READ_WORKERS = 32
 
-def get_system_prompt_version(system_prompt):
-    """Get a human-readable version identifier for the system prompt"""
-    if not system_prompt:
-        return "N/A"
-    
-    prompt_lower = system_prompt.lower()
-    
-    # Identify different prompt versions based on key phrases
-    if "two-phase process" in prompt_lower:
-        return "v2.0 (Two-Phase)"
-    elif "critical rule" in prompt_lower:
-        return "v1.5 (Critical Rule)"
-    elif "script results are authoritative" in prompt_lower:
-        return "v1.2 (Authoritative)"
-    elif "query_complete" in prompt_lower:
-        return "v1.1 (Query Complete)"
-    elif "specialized in analyzing" in prompt_lower:
-        return "v1.0 (Basic)"
-    else:
-        # Fallback to hash for unknown versions
-        return get_system_prompt_hash(system_prompt)
+# Most session files parsed per worker-thread dispatch
+SESSION_READ_BATCH = 256
 
-def extract_script_content(iterations):
-    """Extract the actual script content from iterations"""
-    all_scripts = []
-    
-    for i, iteration in enumerate(iterations, 1):
-        if iteration.get('script_executed', False):
-            exec_result = iteration.get('execution_result', {})
-            script_content = exec_result.get('script_content', '')
-            if script_content:
-                script_header = f"\n=== Iteration {i} Script ==="
-                all_scripts.append(script_header)
-                all_scripts.append(script_content)
-    
-    if all_scripts:
-        return '\n'.join(all_scripts)
-    else:
-        return "No scripts executed"
+def read_session_batch(paths):
+    """Read and parse a batch of session files; failures are returned as the exception"""
+    sessions = []
+    for path in paths:
+        try:
+            sessions.append((path, resolve_system_prompt(loads_json(path.read_bytes()), path.parent)))
+        except Exception as e:
+            sessions.append((path, e))
+    return sessions
 
-def clean_text_for_excel(text):
-    """Clean text to be Excel-friendly"""
-    if not text:
-        return ""
-    
-    # Convert to string and limit length for Excel readability
-    text = str(text).strip()
-    
-    # Replace problematic characters
-    text = text.replace('\n', ' | ').replace('\r', '')
-    
-    # Limit length to avoid Excel issues
-    if len(text) > 1000:
-        text = text[:997] + "..."
-    
-    return text
+async def read_all_sessions(paths):
+    """Read session files in batches spread over SESSION_READ_WORKERS threads, all batches concurrently"""
+    # Enough batches to keep every reader thread busy, none bigger than SESSION_READ_BATCH
+    batch_size = max(1, min(SESSION_READ_BATCH, -(-len(paths) // SESSION_READ_WORKERS)))
+    batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+    
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=SESSION_READ_WORKERS, thread_name_prefix="session-read") as pool:
+        results = await asyncio.gather(*(loop.run_in_executor(pool, read_session_batch, batch) for batch in batches))
+    return [session for batch in results for session in batch]
 
-def migrate_sessions_to_excel():
-    """Main migration function"""
-    
-    # Paths
-    sessions_dir = Path("query_sessions")
-    excel_path = Path("query_tracking.xlsx")
-    
-    if not sessions_dir.exists():
-        print("No query_sessions directory found")
-        return
-    
-    if not excel_path.exists():
-        print("Excel tracking file not found. Please create it first.")
-        return
+# Progress reported while writing, as (fraction of sessions processed, percent)
+WRITE_MILESTONES = ((0.5, 50), (0.75, 75))
+
+def write_sessions_to_excel(sessions, excel_path, on_progress=None):
+    """
+    Append parsed sessions that are not in the Excel file yet
+    on_progress(percent, processed, total) is called at each WRITE_MILESTONES step
+    Returns True if the Excel file was saved
+    """
     
     # Load existing Excel file
     try:
-        wb = load_workbook(excel_path)
-        ws = wb.active
+        # Write any sessions still queued by append_session_to_excel first
+        rebuild_xlsx_from_jsonl(excel_path)
+        # Loaded once and appended to in place, keeping every sheet and the hand-entered columns
+        wb, ws, catalog_ws, existing_sessions, existing_prompts = open_tracking_workbook(excel_path)
         print(f"Loaded Excel file: {excel_path}")
     except Exception as e:
         print(f"Error loading Excel file: {e}")
-        return
-    
-    # Get existing session IDs to avoid duplicates
-    existing_sessions = set()
-    for row in range(2, ws.max_row + 1):
-        session_id = ws.cell(row=row, column=1).value
-        if session_id:
-            existing_sessions.add(session_id)
+        return False
     
     print(f"Found {len(existing_sessions)} existing entries in Excel")
     
-    # Find all JSON session files
-    json_files = list(sessions_dir.glob("session_*.json"))
-    print(f"Found {len(json_files)} JSON session files")
-    
     migrated_count = 0
     skipped_count = 0
     error_count = 0
     
-    for json_file in json_files:
+    milestones = {max(1, int(len(sessions) * fraction)): percent for fraction, percent in WRITE_MILESTONES}
+    
+    for processed, (json_file, session_data) in enumerate(sessions, 1):
+        if on_progress and processed in milestones:
+            on_progress(milestones[processed], processed, len(sessions))
+        
         try:
-            # Load session data
-            with open(json_file, 'r', encoding='utf-8') as f:
-                session_data = json.load(f)
+            if isinstance(session_data, Exception):
+                raise session_data
             
             session_id = session_data.get('session_id', json_file.stem)
             
@@ -148,9 +91,13 @@ def migrate_sessions_to_excel():
             # Extract data for Excel
             user_prompt = clean_text_for_excel(session_data.get('user_query', ''))
             
-            # System prompt handling - now stored in JSON  
+            # System prompt handling - version and hash in column C,
+            # full text once per distinct prompt in the PromptCatalog sheet
             system_prompt = session_data.get('system_prompt', '')
-            system_prompt_full = clean_text_for_excel(system_prompt)  # Full text
+            system_prompt_label = prompt_column_value(system_prompt)
+            if system_prompt and prompt_hash(system_prompt) not in existing_prompts:
+                catalog_ws.append(text_row(catalog_ws, catalog_row(system_prompt)))
+                existing_prompts.add(prompt_hash(system_prompt))
             
             # Files accessed
             files_accessed = session_data.get('files_accessed', [])
@@ -163,26 +110,24 @@ def migrate_sessions_to_excel():
             # Number of iterations
             num_iterations = session_data.get('total_iterations', 0)
             
-            # Script content - actual code
+            # Script content - actual code, cleaned per script rather than rescanned once joined
             iterations = session_data.get('iterations', [])
-            script_content = extract_script_content(iterations)
-            script_content_clean = clean_text_for_excel(script_content)
+            script_content_clean = extract_script_content_for_excel(iterations)
             
             # AI final output
             final_output = clean_text_for_excel(session_data.get('final_answer', ''))
             
-            # Find next empty row
-            next_row = ws.max_row + 1
-            
-            # Write data to Excel
-            ws.cell(row=next_row, column=1, value=session_id)  # A: Session ID
-            ws.cell(row=next_row, column=2, value=user_prompt)  # B: User Prompt
-            ws.cell(row=next_row, column=3, value=system_prompt_full)  # C: System Prompt (Full Text)
-            ws.cell(row=next_row, column=4, value=files_str)  # D: Files Accessed
-            ws.cell(row=next_row, column=5, value=num_iterations)  # E: Number of Iterations
-            ws.cell(row=next_row, column=6, value=script_content_clean)  # F: Script Content (Full Code)
-            ws.cell(row=next_row, column=7, value=final_output)  # G: AI Final Output
-            # H-J left empty for manual entry
+            # Write data to Excel - strings as text, so script headers never become formulas
+            ws.append(text_row(ws, [
+                session_id,  # A: Session ID
+                user_prompt,  # B: User Prompt
+                system_prompt_label,  # C: System Prompt (version + hash)
+                files_str,  # D: Files Accessed
+                num_iterations,  # E: Number of Iterations
+                script_content_clean,  # F: Script Content (Full Code)
+                final_output,  # G: AI Final Output
+                # H-J left empty for manual entry
+            ]))
             
             migrated_count += 1
             existing_sessions.add(session_id)  # Add to prevent duplicates in this run
@@ -192,9 +137,9 @@ def migrate_sessions_to_excel():
             error_count += 1
             continue
     
-    # Save the Excel file
+    # Save the Excel file - written beside it and swapped in, so a failed save keeps the old file
     try:
-        wb.save(excel_path)
+        save_workbook_atomic(wb, excel_path)
         print(f"\nMigration completed!")
         print(f"SUCCESS: Migrated {migrated_count} sessions")
         print(f"SKIPPED: {skipped_count} sessions (duplicates)") 
@@ -206,14 +151,59 @@ def migrate_sessions_to_excel():
             print(f"- Review the migrated data in Excel")
             print(f"- Fill in Expected Output, Human Evaluation, AI Evaluation, and Total Score columns manually")
             print(f"- Future sessions will be automatically added to this file")
+        return True
     
     except Exception as e:
         print(f"Error saving Excel file: {e}")
+        return False
+
+async def migrate_sessions_to_excel(progress_cb=None):
+    """
+    Main migration function
+    progress_cb is an optional coroutine function called as
+    progress_cb(percent, message) at each real milestone
+    """
+    loop = asyncio.get_running_loop()
+    
+    async def report(percent, message):
+        if progress_cb:
+            await progress_cb(percent, message)
+    
+    def report_processed(percent, processed, total):
+        # Called from the worker thread, hand the update back to the event loop
+        asyncio.run_coroutine_threadsafe(report(percent, f"Processed {processed}/{total} sessions"), loop)
+    
+    # Paths
+    sessions_dir = Path("query_sessions")
+    excel_path = EXCEL_PATH
+    
+    if not sessions_dir.exists():
+        print("No query_sessions directory found")
+        return
+    
+    if not excel_path.exists():
+        print("Excel tracking file not found. Please create it first.")
+        return
+    
+    # Find all JSON session files
+    json_files = list(sessions_dir.glob("session_*.json"))
+    print(f"Found {len(json_files)} JSON session files")
+    await report(0, f"Found {len(json_files)} session files")
+    
+    sessions = await read_all_sessions(json_files)
+    await report(25, f"Read {len(sessions)} session files")
+    
+    # openpyxl work is blocking, keep it off the event loop
+    saved = await asyncio.to_thread(
+        write_sessions_to_excel, sessions, excel_path, report_processed if progress_cb else None
+    )
+    if saved:
+        await report(100, "Excel file saved")
 
 def show_migration_summary():
     """Show summary before migration"""
     sessions_dir = Path("query_sessions")
-    excel_path = Path("query_tracking.xlsx")
+    excel_path = EXCEL_PATH
     
     print("=== Session Migration Summary ===")
     
@@ -226,9 +216,11 @@ def show_migration_summary():
     
     if excel_path.exists():
         try:
-            wb = load_workbook(excel_path)
+            # Write-only saves carry no dimension record, so count rows by streaming
+            wb = load_workbook(excel_path, read_only=True)
             ws = wb.active
-            existing_rows = ws.max_row - 1  # Subtract header row
+            existing_rows = sum(1 for _ in ws.iter_rows(min_row=2, max_col=1, values_only=True))
+            wb.close()
             print(f"Existing Excel entries: {existing_rows}")
         except:
             print("Could not read Excel file")
@@ -247,6 +239,6 @@ if __name__ == "__main__":
     # Auto-proceed for script execution
     response = input().lower().strip()
     if response in ['y', 'yes', '']:
-        migrate_sessions_to_excel()
+        asyncio.run(migrate_sessions_to_excel())
     else:
         print("Migration cancelled.")
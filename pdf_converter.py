@@ -1,172 +1,463 @@
 #!/usr/bin/env python3
 """
 PDF Converter Script
-Converts PDF files to TXT and XML formats using pdfplumber
+Converts PDF files to TXT and XML formats using PyMuPDF when installed, pdfplumber otherwise
 """
 
+import io
 import os
+import json
+import hashlib
+import re
 import sys
+import asyncio
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pdfplumber
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+from pdfminer.pdftypes import resolve1
+from xml.sax.saxutils import XMLGenerator
 from datetime import datetime
 
-def extract_text_from_pdf(pdf_path):
-    """Extract text from PDF using pdfplumber"""
+# PyMuPDF parses in C - much faster than pdfplumber for plain text extraction
+try:
+    import pymupdf
+except ImportError:
+    try:
+        import fitz as pymupdf  # PyMuPDF before 1.24
+    except ImportError:
+        pymupdf = None
+
+PDF_BACKENDS = ('pymupdf', 'pdfplumber')
+
+# Progress bar for batch conversion, a plain counter line without it
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
+# Documents with at least this many pages have their pages split across processes
+PARALLEL_PAGE_MIN = 8
+
+# Most processes used for the pages of one document - only the command line and single-process
+# batches split pages; library callers (e.g. the backend) parse in-process unless they ask for it
+PAGE_WORKERS = min(os.cpu_count() or 1, 8)
+
+# Output files are written through a 1 MiB buffer, piece by piece
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Per-file progress messages - batch conversion turns them off and reports one line per file instead
+VERBOSE = True
+
+def report(message):
+    """Print a per-file progress message unless running quiet"""
+    if VERBOSE:
+        print(message)
+
+def set_verbose(verbose):
+    """Turn per-file progress messages on or off (also the worker process initializer)"""
+    global VERBOSE
+    VERBOSE = verbose
+
+# Rule around the TXT metadata header
+RULE = "=" * 50
+
+# Metadata is also written as one "key=value|key=value" line (TXT "META:" line, XML <metadata-flat>)
+# so consumers can pull every field with a single scan of META_PATTERN
+META_FIELDS = ('title', 'author', 'creator', 'pages', 'created', 'modified')
+META_PATTERN = re.compile(r'(?P<k>title|author|creator|pages|created|modified)=(?P<v>[^|\n]*)')
+
+def flat_metadata(metadata):
+    """Metadata as a single "key=value|..." string; separators inside values are replaced"""
+    return "|".join(
+        f"{field}=" + " ".join(str(metadata.get(field, 'Unknown')).replace("|", "/").split())
+        for field in META_FIELDS
+    )
+
+def read_flat_metadata(text):
+    """Parse the flat metadata written by flat_metadata back into a dict"""
+    return {match['k']: match['v'] for match in META_PATTERN.finditer(text)}
+
+def pdf_backend():
+    """Extraction backend from PDF_BACKEND - PyMuPDF by default when it is installed"""
+    backend = os.getenv("PDF_BACKEND", "").lower()
+    if backend not in PDF_BACKENDS:
+        backend = 'pymupdf'
+    if backend == 'pymupdf' and pymupdf is None:
+        backend = 'pdfplumber'
+    return backend
+
+def page_entry(page_num, page_text):
+    """{'page': number, 'text': text}; text is None for pages without extractable text"""
+    page_text = page_text.strip() if page_text else None
+    return {'page': page_num, 'text': page_text or None}
+
+def extract_page_texts(pages):
+    """Text of each pdfplumber page as {'page': number, 'text': text}"""
+    text_content = []
+    for page in pages:
+        text_content.append(page_entry(page.page_number, page.extract_text()))
+        # Drop the page's parsed layout objects now - otherwise the open PDF keeps
+        # every page's objects cached until it is closed, which grows without bound
+        if hasattr(page, 'close'):
+            page.close()
+    return text_content
+
+def extract_page_range(pdf_path, page_numbers, backend='pdfplumber'):
+    """Extract the given pages (1-based); pdfplumber opens only those pages of the PDF"""
+    if backend == 'pymupdf':
+        with pymupdf.open(pdf_path) as doc:
+            return [page_entry(page_num, doc[page_num - 1].get_text("text")) for page_num in page_numbers]
+    with pdfplumber.open(pdf_path, pages=page_numbers) as pdf:
+        return extract_page_texts(pdf.pages)
+
+def extract_pages_parallel(pdf_path, page_numbers, workers, backend):
+    """Extract pages in contiguous slices, one per worker process, in page order"""
+    slice_size = -(-len(page_numbers) // workers)
+    slices = [page_numbers[i:i + slice_size] for i in range(0, len(page_numbers), slice_size)]
+    text_content = []
+    with ProcessPoolExecutor(max_workers=len(slices)) as executor:
+        for page_slice in executor.map(extract_page_range, [pdf_path] * len(slices), slices, [backend] * len(slices)):
+            text_content.extend(page_slice)
+    return text_content
+
+def page_workers_for(page_count, page_workers):
+    """Processes to split a document over - at most page_workers, 1 for short documents"""
+    if page_workers <= 1 or page_count < PARALLEL_PAGE_MIN:
+        return 1
+    return max(1, min(page_workers, page_count // (PARALLEL_PAGE_MIN // 2)))
+
+def parse_page_ranges(spec):
+    """Parse a page selection like "1,3,5-7" into a sorted list of page numbers"""
+    page_numbers = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        first, last = int(first), int(last or first)
+        if first < 1 or last < first:
+            raise ValueError(f"Invalid page range: {part}")
+        page_numbers.update(range(first, last + 1))
+    return sorted(page_numbers)
+
+def extract_with_pymupdf(pdf_path, pdf_bytes=None, pages=None, page_workers=1):
+    """Extract text and metadata with PyMuPDF"""
+    doc = pymupdf.open(stream=pdf_bytes, filetype="pdf") if pdf_bytes is not None else pymupdf.open(pdf_path)
+    with doc:
+        info = doc.metadata or {}
+        metadata = {
+            'title': info.get('title') or 'Unknown',
+            'author': info.get('author') or 'Unknown',
+            'creator': info.get('creator') or 'Unknown',
+            'pages': doc.page_count,
+            'created': info.get('creationDate') or 'Unknown',
+            'modified': info.get('modDate') or 'Unknown'
+        }
+        
+        page_numbers = [n for n in pages if n <= doc.page_count] if pages else list(range(1, doc.page_count + 1))
+        workers = page_workers_for(len(page_numbers), page_workers)
+        if workers == 1:
+            return [page_entry(n, doc[n - 1].get_text("text")) for n in page_numbers], metadata
+    
+    return extract_pages_parallel(pdf_path, page_numbers, workers, 'pymupdf'), metadata
+
+def document_page_count(pdf):
+    """Pages in the whole document, even when pdfplumber opened only some of them"""
+    try:
+        return int(resolve1(pdf.doc.catalog['Pages'])['Count'])
+    except Exception:
+        return len(pdf.pages)
+
+def parse_pdf(pdf_path, pdf_bytes=None, pages=None, page_workers=1):
+    """Parse the PDF with PyMuPDF, or pdfplumber when it isn't installed or can't read the file"""
     text_content = []
     metadata = {}
     
+    if pdf_backend() == 'pymupdf':
+        try:
+            return extract_with_pymupdf(str(pdf_path), pdf_bytes, pages, page_workers)
+        except Exception as e:
+            print(f"WARNING: PyMuPDF could not read {Path(pdf_path).name} ({e}), retrying with pdfplumber")
+    
     try:
-        with pdfplumber.open(pdf_path) as pdf:
+        with pdfplumber.open(io.BytesIO(pdf_bytes) if pdf_bytes is not None else pdf_path, pages=pages) as pdf:
             # Extract metadata
             metadata = {
                 'title': pdf.metadata.get('Title', 'Unknown'),
                 'author': pdf.metadata.get('Author', 'Unknown'),
                 'creator': pdf.metadata.get('Creator', 'Unknown'),
-                'pages': len(pdf.pages),
+                'pages': document_page_count(pdf) if pages else len(pdf.pages),
                 'created': pdf.metadata.get('CreationDate', 'Unknown'),
                 'modified': pdf.metadata.get('ModDate', 'Unknown')
             }
             
-            # Extract text from each page
-            for page_num, page in enumerate(pdf.pages, 1):
-                page_text = page.extract_text()
-                if page_text:
-                    text_content.append({
-                        'page': page_num,
-                        'text': page_text.strip()
-                    })
-                else:
-                    text_content.append({
-                        'page': page_num,
-                        'text': f"[Page {page_num} - No extractable text]"
-                    })
+            # Extract text from each page - long documents in contiguous slices over
+            # several processes, since page parsing is CPU-bound and shares one file handle
+            workers = page_workers_for(len(pdf.pages), page_workers)
+            if workers == 1:
+                text_content = extract_page_texts(pdf.pages)
+            else:
+                page_numbers = [page.page_number for page in pdf.pages]
+        
+        if workers > 1:
+            text_content = extract_pages_parallel(pdf_path, page_numbers, workers, 'pdfplumber')
     
     except Exception as e:
         raise Exception(f"Error reading PDF: {str(e)}")
     
     return text_content, metadata
 
-def convert_pdf_to_txt(pdf_path, output_path=None, include_metadata=True):
-    """Convert PDF to TXT format"""
+# Bytes from the start of a PDF hashed into its cache key, together with its size and mtime
+CACHE_KEY_BYTES = 1 << 16
+
+def extraction_cache_key(pdf_path, pdf_bytes=None, pages=None):
+    """Cache key for one extraction - changes when the file, the backend or the page selection does"""
+    stat = os.stat(pdf_path)
+    if pdf_bytes is not None:
+        head = pdf_bytes[:CACHE_KEY_BYTES]
+    else:
+        with open(pdf_path, 'rb') as f:
+            head = f.read(CACHE_KEY_BYTES)
+    digest = hashlib.blake2b(head, digest_size=16)
+    digest.update(f"{stat.st_size}\0{stat.st_mtime_ns}\0{pdf_backend()}\0{pages or ''}".encode())
+    return digest.hexdigest()
+
+def extract_text_from_pdf(pdf_path, pdf_bytes=None, pages=None, page_workers=1):
+    """
+    Extract text from PDF using PyMuPDF, or pdfplumber when it isn't installed or can't read the file
+    pdf_bytes is the file's content when it was already read, parsed instead of reading pdf_path again
+    pages is an optional list of 1-based page numbers to extract instead of the whole document
+    page_workers > 1 lets long documents be split over that many processes (PAGE_WORKERS on the command line)
+    With PDF_CACHE_DIR set, results are kept there and reused while the file is unchanged
+    (PDF_CACHE_REFRESH=1 re-parses and overwrites them)
+    """
+    cache_dir = os.getenv("PDF_CACHE_DIR")
+    if not cache_dir:
+        return parse_pdf(pdf_path, pdf_bytes, pages, page_workers)
+    
+    try:
+        cache_file = Path(cache_dir) / f"{extraction_cache_key(pdf_path, pdf_bytes, pages)}.json"
+    except OSError:
+        return parse_pdf(pdf_path, pdf_bytes, pages, page_workers)
+    
+    if not os.getenv("PDF_CACHE_REFRESH"):
+        try:
+            cached = json.loads(cache_file.read_text(encoding='utf-8'))
+            return cached['text_content'], cached['metadata']
+        except (OSError, ValueError, KeyError):
+            pass
+    
+    text_content, metadata = parse_pdf(pdf_path, pdf_bytes, pages, page_workers)
+    
+    # Written beside it and swapped in, so a concurrent reader never sees half a file
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        temp_file.write_text(
+            json.dumps({'text_content': text_content, 'metadata': metadata}, ensure_ascii=False, default=str),
+            encoding='utf-8'
+        )
+        os.replace(temp_file, cache_file)
+    except OSError as e:
+        print(f"WARNING: Could not cache extraction of {Path(pdf_path).name}: {e}")
+    
+    return text_content, metadata
+
+def extract_for_formats(pdf_path, format_type, pdf_bytes=None, pages=None, page_workers=1):
+    """
+    Extract up front when both formats are written or the file was already read, so the PDF is only parsed once
+    Returns None otherwise - the converters then extract themselves
+    On failure the exception is returned, for each converter to report without parsing the PDF again
+    """
+    if format_type != 'both' and pdf_bytes is None:
+        return None
+    try:
+        return extract_text_from_pdf(pdf_path, pdf_bytes, pages, page_workers)
+    except Exception as e:
+        return e
+
+def convert_pdf_to_txt(pdf_path, output_path=None, include_metadata=True, extracted=None, extracted_at=None, pages=None,
+                       page_workers=1):
+    """
+    Convert PDF to TXT format; extracted is an optional (text_content, metadata) already read from it,
+    or the exception extract_for_formats() ran into
+    extracted_at is the datetime stamped in the header, now by default; pages limits it to those page numbers
+    page_workers is passed on to extract_text_from_pdf
+    """
     
     # Determine output path
     if output_path is None:
         pdf_file = Path(pdf_path)
         output_path = pdf_file.parent / f"{pdf_file.stem}.txt"
     
-    print(f"Converting {pdf_path} to TXT...")
+    report(f"Converting {pdf_path} to TXT...")
     
     try:
-        # Extract content
-        text_content, metadata = extract_text_from_pdf(pdf_path)
-        
-        # Build TXT content
-        txt_lines = []
-        
-        if include_metadata:
-            txt_lines.extend([
-                "PDF Text Extraction - Full Document",
-                "=" * 50,
-                "",
-                f"Source File: {Path(pdf_path).name}",
-                f"Title: {metadata['title']}",
-                f"Author: {metadata['author']}",
-                f"Pages: {metadata['pages']}",
-                f"Extracted: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-                "",
-                "=" * 50,
-                ""
-            ])
-        
-        # Add page content
-        for page_data in text_content:
-            txt_lines.extend([
-                f"--- Page {page_data['page']} ---",
-                page_data['text'],
-                ""
-            ])
+        # Extract content - or report the error the shared extraction already ran into
+        if isinstance(extracted, Exception):
+            raise extracted
+        text_content, metadata = extracted or extract_text_from_pdf(pdf_path, pages=pages, page_workers=page_workers)
         
-        # Write to file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(txt_lines))
+        # Write to file - streamed page by page rather than joined into one string first
+        with open(output_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+            separator = ""
+            
+            if include_metadata:
+                extracted_at = extracted_at or datetime.now()
+                f.write(
+                    f"PDF Text Extraction - Full Document\n"
+                    f"{RULE}\n"
+                    f"\n"
+                    f"Source File: {Path(pdf_path).name}\n"
+                    f"Title: {metadata['title']}\n"
+                    f"Author: {metadata['author']}\n"
+                    f"Pages: {metadata['pages']}\n"
+                    f"Extracted: {extracted_at:%Y-%m-%d %H:%M:%S}\n"
+                    f"META: {flat_metadata(metadata)}\n"
+                    f"\n"
+                    f"{RULE}\n"
+                )
+                separator = "\n"
+            
+            # Add page content, pages separated by a blank line - one write per page
+            write = f.write
+            for page_data in text_content:
+                # Pages without text keep their header but get no body
+                if page_data['text']:
+                    write(f"{separator}--- Page {page_data['page']} ---\n{page_data['text']}\n")
+                else:
+                    write(f"{separator}--- Page {page_data['page']} ---\n")
+                separator = "\n"
         
-        print(f"SUCCESS: TXT file created: {output_path}")
-        print(f"   Pages extracted: {len(text_content)}")
+        report(f"SUCCESS: TXT file created: {output_path}")
+        report(f"   Pages extracted: {len(text_content)}")
         return str(output_path)
         
     except Exception as e:
         print(f"ERROR: Converting to TXT: {e}")
         return None
 
-def convert_pdf_to_xml(pdf_path, output_path=None, include_metadata=True):
-    """Convert PDF to XML format"""
+def convert_pdf_to_xml(pdf_path, output_path=None, include_metadata=True, extracted=None, extracted_at=None, pages=None,
+                       page_workers=1):
+    """
+    Convert PDF to XML format; extracted is an optional (text_content, metadata) already read from it,
+    or the exception extract_for_formats() ran into
+    extracted_at is the datetime stamped in the metadata, now by default; pages limits it to those page numbers
+    page_workers is passed on to extract_text_from_pdf
+    """
     
     # Determine output path
     if output_path is None:
         pdf_file = Path(pdf_path)
         output_path = pdf_file.parent / f"{pdf_file.stem}.xml"
     
-    print(f"Converting {pdf_path} to XML...")
+    report(f"Converting {pdf_path} to XML...")
     
     try:
-        # Extract content
-        text_content, metadata = extract_text_from_pdf(pdf_path)
-        
-        # Create XML structure
-        root = ET.Element("document")
-        
-        # Add metadata if requested
-        if include_metadata:
-            meta_elem = ET.SubElement(root, "metadata")
-            ET.SubElement(meta_elem, "source_file").text = Path(pdf_path).name
-            ET.SubElement(meta_elem, "title").text = str(metadata['title'])
-            ET.SubElement(meta_elem, "author").text = str(metadata['author'])
-            ET.SubElement(meta_elem, "creator").text = str(metadata['creator'])
-            ET.SubElement(meta_elem, "pages").text = str(metadata['pages'])
-            ET.SubElement(meta_elem, "created").text = str(metadata['created'])
-            ET.SubElement(meta_elem, "modified").text = str(metadata['modified'])
-            ET.SubElement(meta_elem, "extracted").text = datetime.now().isoformat()
-        
-        # Add content
-        content_elem = ET.SubElement(root, "content")
+        # Extract content - or report the error the shared extraction already ran into
+        if isinstance(extracted, Exception):
+            raise extracted
+        text_content, metadata = extracted or extract_text_from_pdf(pdf_path, pages=pages, page_workers=page_workers)
         
-        for page_data in text_content:
-            page_elem = ET.SubElement(content_elem, "page", number=str(page_data['page']))
-            page_elem.text = page_data['text']
-        
-        # Create pretty XML
-        xml_str = ET.tostring(root, encoding='unicode')
-        pretty_xml = minidom.parseString(xml_str).toprettyxml(indent="  ")
-        
-        # Remove empty lines that minidom adds
-        lines = [line for line in pretty_xml.split('\n') if line.strip()]
-        clean_xml = '\n'.join(lines)
-        
-        # Write to file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(clean_xml)
+        # Write to file - elements are streamed into the buffered file as they are
+        # generated, two-space indented, without building a tree first
+        with open(output_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+            gen = XMLGenerator(f, encoding='utf-8', short_empty_elements=True)
+            
+            def text_element(name, text, depth, attrs=None):
+                gen.ignorableWhitespace("\n" + "  " * depth)
+                gen.startElement(name, attrs or {})
+                if text:
+                    gen.characters(text)
+                gen.endElement(name)
+            
+            f.write('<?xml version="1.0" ?>\n')
+            gen.startElement("document", {})
+            
+            # Add metadata if requested
+            if include_metadata:
+                gen.ignorableWhitespace("\n  ")
+                gen.startElement("metadata", {})
+                text_element("source_file", Path(pdf_path).name, 2)
+                text_element("title", str(metadata['title']), 2)
+                text_element("author", str(metadata['author']), 2)
+                text_element("creator", str(metadata['creator']), 2)
+                text_element("pages", str(metadata['pages']), 2)
+                text_element("created", str(metadata['created']), 2)
+                text_element("modified", str(metadata['modified']), 2)
+                text_element("metadata-flat", flat_metadata(metadata), 2)
+                text_element("extracted", (extracted_at or datetime.now()).isoformat(), 2)
+                gen.ignorableWhitespace("\n  ")
+                gen.endElement("metadata")
+            
+            # Add content
+            gen.ignorableWhitespace("\n  ")
+            gen.startElement("content", {})
+            for page_data in text_content:
+                text_element("page", page_data['text'], 2, {'number': str(page_data['page'])})
+            if text_content:
+                gen.ignorableWhitespace("\n  ")
+            gen.endElement("content")
+            
+            gen.ignorableWhitespace("\n")
+            gen.endElement("document")
         
-        print(f"SUCCESS: XML file created: {output_path}")
-        print(f"   Pages extracted: {len(text_content)}")
+        report(f"SUCCESS: XML file created: {output_path}")
+        report(f"   Pages extracted: {len(text_content)}")
         return str(output_path)
         
     except Exception as e:
         print(f"ERROR: Converting to XML: {e}")
         return None
 
-def batch_convert(input_dir, output_dir=None, format_type='both', include_metadata=True):
-    """Convert all PDF files in a directory"""
+def default_workers(pdf_count):
+    """Worker processes for a batch: one per PDF, capped by the CPU count and at 4"""
+    return max(1, min(os.cpu_count() or 1, 4, pdf_count))
+
+def convert_one_pdf(pdf_file, output_path, format_type, include_metadata, pdf_bytes=None, extracted_at=None, pages=None,
+                    page_workers=1):
+    """
+    Convert a single PDF for batch_convert (module level so worker processes can run it)
+    pdf_bytes is the file's content when batch_convert already read it, extracted_at the batch's timestamp,
+    pages the page numbers to convert (all by default), page_workers the processes its pages may be split over
+    Returns (txt file or None, xml file or None)
+    """
+    pdf_file = Path(pdf_file)
+    output_path = Path(output_path)
+    report(f"\nProcessing: {pdf_file.name}")
+    
+    txt_result = None
+    xml_result = None
+    extracted = extract_for_formats(pdf_file, format_type, pdf_bytes, pages, page_workers)
+    
+    # Convert to TXT
+    if format_type in ['txt', 'both']:
+        txt_output = output_path / f"{pdf_file.stem}.txt"
+        txt_result = convert_pdf_to_txt(pdf_file, txt_output, include_metadata, extracted, extracted_at, pages, page_workers)
+    
+    # Convert to XML
+    if format_type in ['xml', 'both']:
+        xml_output = output_path / f"{pdf_file.stem}.xml"
+        xml_result = convert_pdf_to_xml(pdf_file, xml_output, include_metadata, extracted, extracted_at, pages, page_workers)
+    
+    return txt_result, xml_result
+
+async def batch_convert(input_dir, output_dir=None, format_type='both', include_metadata=True, workers=None, pages=None):
+    """
+    Convert all PDF files in a directory, several PDFs at once in separate processes
+    Files are read from disk on threads ahead of the parse workers, so I/O overlaps parsing
+    """
     
     input_path = Path(input_dir)
     if not input_path.exists():
         print(f"ERROR: Input directory does not exist: {input_dir}")
         return
     
-    # Find PDF files
-    pdf_files = list(input_path.glob("*.pdf"))
+    # Find PDF files - scandir entries carry their type from the directory listing, no stat per file
+    with os.scandir(input_path) as entries:
+        pdf_files = [Path(entry.path) for entry in entries
+                     if entry.name.lower().endswith('.pdf') and entry.is_file()]
     if not pdf_files:
         print(f"ERROR: No PDF files found in: {input_dir}")
         return
@@ -182,33 +473,79 @@ def batch_convert(input_dir, output_dir=None, format_type='both', include_metada
     
     results = {'txt': [], 'xml': [], 'errors': []}
     
-    for pdf_file in pdf_files:
-        print(f"\nProcessing: {pdf_file.name}")
+    # One extraction timestamp for the whole batch
+    extracted_at = datetime.now()
+    
+    # One progress line (or bar update) per file instead of several messages from each conversion
+    progress = tqdm(total=len(pdf_files), unit="pdf") if tqdm else None
+    completed = 0
+    
+    def record(pdf_file, outcome):
+        nonlocal completed
+        completed += 1
         
-        try:
-            # Convert to TXT
-            if format_type in ['txt', 'both']:
-                txt_output = output_path / f"{pdf_file.stem}.txt"
-                txt_result = convert_pdf_to_txt(pdf_file, txt_output, include_metadata)
-                if txt_result:
-                    results['txt'].append(txt_result)
-            
-            # Convert to XML
-            if format_type in ['xml', 'both']:
-                xml_output = output_path / f"{pdf_file.stem}.xml"
-                xml_result = convert_pdf_to_xml(pdf_file, xml_output, include_metadata)
-                if xml_result:
-                    results['xml'].append(xml_result)
-                    
-        except Exception as e:
-            error_msg = f"{pdf_file.name}: {str(e)}"
+        if isinstance(outcome, Exception):
+            error_msg = f"{pdf_file.name}: {str(outcome)}"
             results['errors'].append(error_msg)
-            print(f"ERROR: Processing {pdf_file.name}: {e}")
+            message = f"ERROR: Processing {pdf_file.name}: {outcome}"
+        else:
+            txt_result, xml_result = outcome
+            if txt_result:
+                results['txt'].append(txt_result)
+            if xml_result:
+                results['xml'].append(xml_result)
+            message = None
+        
+        if progress:
+            if message:
+                progress.write(message)
+            progress.update(1)
+        else:
+            print(message or f"[{completed}/{len(pdf_files)}] {pdf_file.name}")
+    
+    # PDF parsing is CPU-bound Python, so independent files go to separate processes
+    workers = workers or default_workers(len(pdf_files))
+    if workers == 1:
+        set_verbose(False)
+        try:
+            for pdf_file in pdf_files:
+                try:
+                    outcome = convert_one_pdf(
+                        pdf_file, output_path, format_type, include_metadata, None, extracted_at, pages, PAGE_WORKERS
+                    )
+                except Exception as e:
+                    outcome = e
+                record(pdf_file, outcome)
+        finally:
+            set_verbose(True)
+    else:
+        print(f"Using {workers} worker processes")
+        loop = asyncio.get_running_loop()
+        # Files read ahead of the parse workers - at most two per worker held in memory
+        read_ahead = asyncio.Semaphore(workers * 2)
+        
+        async def convert(pdf_file):
+            try:
+                async with read_ahead:
+                    pdf_bytes = await loop.run_in_executor(None, pdf_file.read_bytes)
+                    outcome = await loop.run_in_executor(
+                        executor, convert_one_pdf, str(pdf_file), str(output_path), format_type, include_metadata,
+                        pdf_bytes, extracted_at, pages
+                    )
+            except Exception as e:
+                outcome = e
+            record(pdf_file, outcome)
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=set_verbose, initargs=(False,)) as executor:
+            await asyncio.gather(*(convert(pdf_file) for pdf_file in pdf_files))
+    
+    if progress:
+        progress.close()
     
     # Print summary
-    print(f"\n" + "=" * 50)
+    print(f"\n" + RULE)
     print("CONVERSION SUMMARY")
-    print("=" * 50)
+    print(RULE)
     print(f"TXT files created: {len(results['txt'])}")
     print(f"XML files created: {len(results['xml'])}")
     print(f"Errors: {len(results['errors'])}")
@@ -221,7 +558,7 @@ def batch_convert(input_dir, output_dir=None, format_type='both', include_metada
 def main():
     """Main function with command line interface"""
     parser = argparse.ArgumentParser(
-        description="Convert PDF files to TXT and/or XML format using pdfplumber",
+        description="Convert PDF files to TXT and/or XML format using PyMuPDF when installed, pdfplumber otherwise",
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="""
 Examples:
@@ -231,6 +568,7 @@ Examples:
   python pdf_converter.py --batch input_folder/           # Convert all PDFs in folder
   python pdf_converter.py document.pdf --output output/   # Specify output location
   python pdf_converter.py document.pdf --no-metadata      # Skip metadata in output
+  python pdf_converter.py document.pdf --pages 1,3,5-7    # Convert only some pages
 """
     )
     
@@ -244,6 +582,16 @@ Examples:
                        help='Skip metadata in output files')
     parser.add_argument('--list-deps', action='store_true',
                        help='List required dependencies')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Worker processes for batch conversion (default: CPU count, at most 4)')
+    parser.add_argument('--pages', type=parse_page_ranges, default=None,
+                       help='Only convert these pages, e.g. 1,3,5-7 (default: all)')
+    parser.add_argument('--cache-dir', default=None,
+                       help='Reuse extracted text cached here for unchanged PDFs (default: PDF_CACHE_DIR)')
+    parser.add_argument('--force-refresh', action='store_true',
+                       help='Re-parse every PDF and overwrite its cached extraction')
+    parser.add_argument('--backend', choices=PDF_BACKENDS, default=None,
+                       help='Text extraction library (default: PDF_BACKEND, else pymupdf when installed)')
     
     args = parser.parse_args()
     
@@ -251,6 +599,8 @@ Examples:
     if args.list_deps:
         print("Required dependencies:")
         print("  pip install pdfplumber")
+        print("Optional (faster text extraction):")
+        print("  pip install pymupdf")
         return
     
     if not args.input:
@@ -266,9 +616,17 @@ Examples:
     
     include_metadata = not args.no_metadata
     
+    # Through the environment so batch worker processes use them too
+    if args.backend:
+        os.environ["PDF_BACKEND"] = args.backend
+    if args.cache_dir:
+        os.environ["PDF_CACHE_DIR"] = args.cache_dir
+    if args.force_refresh:
+        os.environ["PDF_CACHE_REFRESH"] = "1"
+    
     # Batch conversion
     if args.batch:
-        batch_convert(args.input, args.output, args.format, include_metadata)
+        asyncio.run(batch_convert(args.input, args.output, args.format, include_metadata, args.workers, args.pages))
         return
     
     # Single file conversion
@@ -287,13 +645,14 @@ Examples:
     print()
     
     # Convert based on format choice
+    extracted = extract_for_formats(args.input, args.format, pages=args.pages, page_workers=PAGE_WORKERS)
     if args.format in ['txt', 'both']:
         txt_output = args.output if args.output and args.format == 'txt' else None
-        convert_pdf_to_txt(args.input, txt_output, include_metadata)
+        convert_pdf_to_txt(args.input, txt_output, include_metadata, extracted, pages=args.pages, page_workers=PAGE_WORKERS)
     
     if args.format in ['xml', 'both']:
         xml_output = args.output if args.output and args.format == 'xml' else None
-        convert_pdf_to_xml(args.input, xml_output, include_metadata)
+        convert_pdf_to_xml(args.input, xml_output, include_metadata, extracted, pages=args.pages, page_workers=PAGE_WORKERS)
 
 if __name__ == "__main__":
     main()
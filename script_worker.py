@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Script Worker
+Pre-warmed interpreter for generated query scripts. The libraries scripts usually need
+are imported at startup, then the worker reads one script from stdin - its path on the
+first line, the source after it - and runs it exactly like `python <script>` would.
+The script never has to exist on disk
+"""
+
+import os
+import sys
+import importlib
+import linecache
+import traceback
+
+# Libraries generated scripts commonly import; missing ones are simply skipped
+PRELOAD_MODULES = (
+    "json", "re", "csv", "xml.etree.ElementTree",
+    "pdfplumber", "PyPDF2", "pandas", "bs4"
+)
+
+def preload():
+    """Import the usual script libraries so the script doesn't pay for them"""
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+
+def run_script(script_path, source):
+    """Run script source as __main__ under script_path, reporting errors the way the interpreter does"""
+    # Tracebacks show the script's lines even though no file was written
+    lines = source.decode('utf-8', errors='replace').splitlines(True)
+    linecache.cache[script_path] = (len(source), None, lines, script_path)
+    
+    try:
+        code = compile(source, script_path, 'exec')
+    except SyntaxError:
+        etype, value, _ = sys.exc_info()
+        traceback.print_exception(etype, value, None)
+        sys.exit(1)
+    
+    sys.argv = [script_path]
+    sys.path[0] = os.path.dirname(script_path)
+    namespace = {'__name__': '__main__', '__file__': script_path, '__builtins__': __builtins__}
+    
+    try:
+        exec(code, namespace)
+    except SystemExit:
+        raise
+    except BaseException:
+        # Skip this frame so the traceback starts in the script
+        etype, value, tb = sys.exc_info()
+        traceback.print_exception(etype, value, tb.tb_next)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    preload()
+    script_path = sys.stdin.buffer.readline().decode('utf-8').strip()
+    if script_path:
+        run_script(script_path, sys.stdin.buffer.read())
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Server Config
+uvicorn settings shared by backend_main.py and start_backend.py
+"""
+
+import os
+import importlib.util
+
+def server_options():
+    """
+    Event loop, HTTP parser and worker count for uvicorn
+    uvloop and httptools (C implementations) are used when installed, as uvicorn[standard] does
+    everywhere but Windows. Chats, WebSocket connections and the AI system live in process
+    memory, so BACKEND_WORKERS stays 1 unless that state is moved out
+    """
+    return {
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+        "workers": max(1, int(os.getenv("BACKEND_WORKERS", "1"))),
+    }
@@ -8,6 +8,8 @@ import os
 import sys
 import uvicorn
 from pathlib import Path
+from dotenv import load_dotenv
+from server_config import server_options
 
 def main():
     print("Starting AI File Query Backend...")
@@ -15,22 +17,28 @@ def main():
     # Change to the project directory
     script_dir = Path(__file__).parent
     os.chdir(script_dir)
+    load_dotenv()
     
-    # Ensure necessary directories exist
-    dirs_to_create = [
+    # Ensure necessary directories exist - one directory listing, mkdir only for missing ones
+    dirs_to_create = (
         "files_to_query",
-        "query_sessions", 
+        "query_sessions",
         "temp_scripts",
         "frontend_chats",
         "__pycache__"
-    ]
+    )
     
+    existing = set(os.listdir("."))
     for dir_name in dirs_to_create:
-        Path(dir_name).mkdir(exist_ok=True)
-        print(f"✓ Directory {dir_name} ready")
+        if dir_name not in existing:
+            os.makedirs(dir_name, exist_ok=True)
+    print("\n".join(f"✓ Directory {dir_name} ready" for dir_name in dirs_to_create))
+    
+    options = server_options()
     
     print("\nBackend Configuration:")
     print("- File watching: DISABLED (prevents interruption during AI processing)")
+    print(f"- Event loop: {options['loop']}, HTTP parser: {options['http']}, workers: {options['workers']}")
     print("- Host: 0.0.0.0:8000")
     print("- Frontend should connect to: http://localhost:8000")
     print("- API docs available at: http://localhost:8000/docs")
@@ -47,7 +55,8 @@ def main():
             port=8000,
             reload=False,  # Disabled to prevent interruption during AI processing
             log_level="info",
-            access_log=True
+            access_log=True,
+            **options
         )
     except KeyboardInterrupt:
         print("\n\nBackend stopped by user")